@@ -0,0 +1,444 @@
+# benchmarks/run.py
+"""
+Benchmarks reproducibles contra stubs locales de dolarapi, Telegram y Supabase.
+
+Mide:
+  - micro: prepare_data, format_message, escrituras de historial (JSON, CSV,
+    SQLite) con archivos de tamaño creciente, gráficos y render de
+    dolar_table.html (compilación con y sin bytecode, tarjetas nuevas y cacheadas).
+  - e2e: latencia y throughput de GET /, POST /webhook y GET /dolar/grafico con
+    carga concurrente (más el costo del render de la plantilla por request), y la
+    duración de un tick del scheduler (solo y bajo carga).
+  - coldstart: perfil de `python -X importtime -c "import main"` y tiempo hasta la
+    primera respuesta de GET / levantando uvicorn en un proceso nuevo con un
+    snapshot persistido viejo (como al despertar la instancia de Render).
+
+Todo corre en un directorio temporal (DATA_DIR/LOG_DIR), así que no toca data/.
+Los resultados se guardan en benchmarks/results/<fecha>.json y se comparan con
+la corrida anterior (o con --compare) marcando regresiones.
+
+Uso:
+    python -m benchmarks.run
+    python -m benchmarks.run --only micro
+    python -m benchmarks.run --only coldstart
+    python -m benchmarks.run --latency 0.05 --error-rate 0.1 --concurrency 16 --requests 400
+    python -m benchmarks.run --compare benchmarks/results/20251030-120000.json --fail-on-regression
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.stubs import start_stubs
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+ROOT_DIR = Path(__file__).resolve().parent.parent
+HISTORY_SIZES = (100, 1000, 10000)
+COLDSTART_TARGET_SECONDS = 2.0 # objetivo de tiempo hasta la primera respuesta de GET /
+
+# ---------------- Helpers de medición ----------------
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def _summary(samples_s, wall_s=None, errors=0):
+    ms = [s * 1000 for s in samples_s]
+    result = {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 4) if ms else 0.0,
+        "p50_ms": round(_percentile(ms, 50), 4),
+        "p95_ms": round(_percentile(ms, 95), 4),
+        "p99_ms": round(_percentile(ms, 99), 4),
+    }
+    if wall_s:
+        result["rps"] = round(len(ms) / wall_s, 2)
+    if errors:
+        result["errors"] = errors
+    return result
+
+def _time_calls(fn, number):
+    samples = []
+    for _ in range(number):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return _summary(samples)
+
+# ---------------- Micro ----------------
+def run_micro(number):
+    from config.constants import HISTORY_JSON_FILE, HISTORY_CSV_FILE, SQLITE_DB_FILE
+    from services.dolar_services import fetch_snapshot, format_message
+    from storage.csv_history import append_to_csv, recent_series
+    from storage.json_history import append_to_json_history
+    from storage.sqlite_history import insert_rows
+    from utils.file_helpers import save_json
+    from utils.charts import line_chart_png, line_chart_svg, sparkline_svg
+    from utils.formatters import prepare_data
+
+    snapshot = fetch_snapshot()
+    initial = snapshot.to_dict()
+    results = {
+        "prepare_data": _time_calls(lambda: prepare_data(snapshot, initial), number),
+        # prepare_data es diferido: medimos también el costo de leer todos los campos al renderizar
+        "prepare_data_render": _time_calls(
+            lambda: [(c.compra, c.venta, c.pct_compra, c.pct_venta, c.emoji_compra) for c in prepare_data(snapshot, initial).values()],
+            number,
+        ),
+        "format_message": _time_calls(lambda: format_message(snapshot, initial), number),
+    }
+
+    row = {"timestamp": snapshot.timestamp.isoformat(), "compra": 1450.0, "venta": 1470.0,
+           "diff_compra": 0.0, "diff_venta": 0.0, "pct_compra": 0.0, "pct_venta": 0.0}
+    appends = max(5, number // 50)
+    for size in HISTORY_SIZES:
+        # history.json con `size` registros repartidos entre los tipos
+        per_type = max(1, size // 7)
+        save_json(HISTORY_JSON_FILE, {name: [row] * per_type for name in initial})
+        results[f"json_append_{size}"] = _time_calls(lambda: append_to_json_history("blue", row), appends)
+
+        # Mismo orden de columnas que scheduler.tasks (timestamp, dolar_name, ...)
+        csv_rows = [{"timestamp": row["timestamp"], "dolar_name": name, **row} for name in initial]
+        if os.path.exists(HISTORY_CSV_FILE):
+            os.remove(HISTORY_CSV_FILE)
+        append_to_csv(csv_rows * per_type)
+        results[f"csv_append_{size}"] = _time_calls(lambda: append_to_csv(csv_rows), appends)
+
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(f"{SQLITE_DB_FILE}{suffix}"):
+                os.remove(f"{SQLITE_DB_FILE}{suffix}")
+        insert_rows([
+            {**row, "dolar_name": name, "timestamp": datetime.fromtimestamp(1_700_000_000 + i).astimezone().isoformat()}
+            for i in range(per_type) for name in initial
+        ])
+        counter = iter(range(10**9))
+        results[f"sqlite_insert_{size}"] = _time_calls(
+            lambda: insert_rows([{**row, "dolar_name": name, "timestamp": datetime.fromtimestamp(1_800_000_000 + next(counter)).astimezone().isoformat()} for name in initial]),
+            appends,
+        )
+
+    # Gráficos desde el CSV que quedó con HISTORY_SIZES[-1] registros
+    series = recent_series(100)
+    results["chart_svg"] = _time_calls(lambda: line_chart_svg(series), appends)
+    results["chart_png"] = _time_calls(lambda: line_chart_png(series), appends)
+    results["sparklines"] = _time_calls(lambda: [sparkline_svg(ys) for _, ys in series.values()], number)
+    results.update(_render_benchmarks(snapshot, initial, number))
+
+    # Los end to end arrancan con el historial vacío para que sean comparables entre corridas
+    for path in (HISTORY_JSON_FILE, HISTORY_CSV_FILE, *(f"{SQLITE_DB_FILE}{s}" for s in ("", "-wal", "-shm"))):
+        if os.path.exists(path):
+            os.remove(path)
+    return results
+
+def _render_benchmarks(snapshot, initial, number):
+    """
+    Render de dolar_table.html sin request (url_for fijo): compilación de la
+    plantilla sin y con bytecode en disco, página con todas las tarjetas
+    re-renderizadas (caché vacía) y página con las tarjetas desde caché.
+    """
+    from config.constants import SPARKLINE_POINTS
+    from services.analytics import get_analytics
+    from storage.csv_history import recent_series
+    from utils import templating
+    from utils.formatters import prepare_data
+
+    def compile_fresh():
+        env = templating.create_templates(os.path.join(ROOT_DIR, "templates")).env
+        env.get_template("dolar_table.html")
+        env.get_template(templating.CARD_TEMPLATE)
+
+    for name in os.listdir(templating.TEMPLATE_CACHE_DIR) if os.path.isdir(templating.TEMPLATE_CACHE_DIR) else ():
+        os.remove(os.path.join(templating.TEMPLATE_CACHE_DIR, name))
+    results = {"template_compile": _time_calls(compile_fresh, 1)}
+    results["template_compile_bytecode"] = _time_calls(compile_fresh, max(5, number // 50))
+
+    env = templating.create_templates(os.path.join(ROOT_DIR, "templates")).env
+    template = env.get_template("dolar_table.html")
+    context = {
+        "title": "Cotizaciones", "now": "", "full_date": "", "CHECK_INTERVAL_MINUTES": 5,
+        "url_for": lambda name, path: path,
+        "data": prepare_data(snapshot, initial),
+        "sparkline_series": recent_series(SPARKLINE_POINTS),
+        "analytics": get_analytics(snapshot)["types"],
+    }
+    def render_uncached():
+        # Caché vacía en cada render: todas las tarjetas se vuelven a armar
+        templating._cards.clear()
+        return template.render(context, cache_cards=True)
+
+    results["render_index"] = _time_calls(render_uncached, number)
+    results["render_index_cached"] = _time_calls(lambda: template.render(context, cache_cards=True), number)
+    return results
+
+# ---------------- End to end ----------------
+def _start_server():
+    import uvicorn
+    import main
+    from routes import dolar as dolar_routes
+
+    # /dolar/* no está montado en main; lo agregamos para poder medir /dolar/grafico
+    if not any(getattr(r, "path", "") == "/dolar/grafico" for r in main.app.routes):
+        main.app.include_router(dolar_routes.router)
+
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=0, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, f"http://127.0.0.1:{port}"
+
+def _load(base_url, method, path, total, concurrency, body=None):
+    import requests
+
+    local = threading.local()
+    errors = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        session = getattr(local, "session", None) or requests.Session()
+        local.session = session
+        start = time.perf_counter()
+        try:
+            resp = session.request(method, base_url + path, json=body, timeout=60)
+            ok = resp.status_code < 400
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        if not ok:
+            with lock:
+                errors += 1
+        return elapsed
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(total)))
+    return _summary(samples, time.perf_counter() - wall_start, errors)
+
+def _render_cost(before):
+    """Promedio de dolar_table.html desde `before` ((sum, count) del histograma)."""
+    from utils.metrics import TEMPLATE_RENDER_SECONDS
+
+    total_s, count = TEMPLATE_RENDER_SECONDS.snapshot(template="dolar_table.html")
+    n = count - before[1]
+    return {"n": n, "mean_ms": round((total_s - before[0]) / n * 1000, 4) if n else 0.0}
+
+def run_e2e(total, concurrency, ticks):
+    from zoneinfo import ZoneInfo
+    from scheduler import tasks
+
+    market_time = datetime.now(ZoneInfo("America/Argentina/Buenos_Aires")).replace(hour=12, minute=0)
+    from utils.metrics import TEMPLATE_RENDER_SECONDS
+
+    server, thread, base_url = _start_server()
+    try:
+        render_before = TEMPLATE_RENDER_SECONDS.snapshot(template="dolar_table.html")
+        results = {
+            "get_index": _load(base_url, "GET", "/", total, concurrency),
+            # Costo del render dentro de cada GET / con carga concurrente (histograma del server)
+            "get_index_render": _render_cost(render_before),
+            "post_webhook": _load(base_url, "POST", "/webhook", total, concurrency,
+                                  body={"message": {"chat": {"id": 1}, "text": "/dolar"}}),
+            "get_grafico": _load(base_url, "GET", "/dolar/grafico", max(10, total // 4), concurrency),
+            "scheduler_tick": _time_calls(lambda: tasks.check_and_save_dolar(now=market_time), ticks),
+        }
+
+        # Tick del scheduler mientras la web está bajo carga
+        tick_result = {}
+        def ticker():
+            tick_result.update(_time_calls(lambda: tasks.check_and_save_dolar(now=market_time), ticks))
+        t = threading.Thread(target=ticker)
+        t.start()
+        render_before = TEMPLATE_RENDER_SECONDS.snapshot(template="dolar_table.html")
+        results["get_index_during_ticks"] = _load(base_url, "GET", "/", total, concurrency)
+        results["get_index_render_during_ticks"] = _render_cost(render_before)
+        t.join()
+        results["scheduler_tick_under_load"] = tick_result
+        return results
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+# ---------------- Arranque en frío ----------------
+def _import_profile(top=10):
+    """Módulos con mayor tiempo de import acumulado al importar main."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT_DIR, env=os.environ, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative.isdigit():
+            modules.append((int(cumulative), name))
+    total = next((us for us, name in modules if name == "main"), 0)
+    modules.sort(reverse=True)
+    return {
+        "import_main_ms": round(total / 1000, 1),
+        "top_ms": {name: round(us / 1000, 1) for us, name in modules[1:top + 1]},
+    }
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _time_to_first_response(timeout=60):
+    import requests
+
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=os.environ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if requests.get(f"http://127.0.0.1:{port}/", timeout=timeout).status_code == 200:
+                    return time.perf_counter() - start
+            except requests.ConnectionError:
+                time.sleep(0.01)
+        raise TimeoutError("La app no respondió GET / a tiempo")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+def run_coldstart(runs):
+    from models.snapshot import Snapshot
+    from services.dolar_services import fetch_snapshot
+    from storage.snapshot_store import publish_snapshot
+
+    results = {"imports": _import_profile()}
+    # Snapshot persistido de ayer: la primera respuesta no debe esperar a la API
+    current = fetch_snapshot()
+    stale = Snapshot.from_rates(current.to_dict(), timestamp=current.timestamp - timedelta(days=1))
+    samples = []
+    for _ in range(runs):
+        publish_snapshot(stale)
+        samples.append(_time_to_first_response())
+    results["time_to_first_response"] = _summary(samples)
+    p50_s = results["time_to_first_response"]["p50_ms"] / 1000
+    results["time_to_first_response"]["target_ms"] = COLDSTART_TARGET_SECONDS * 1000
+    if p50_s > COLDSTART_TARGET_SECONDS:
+        print(f"⚠️ Arranque en frío: {p50_s:.2f}s supera el objetivo de {COLDSTART_TARGET_SECONDS}s")
+    return results
+
+# ---------------- Resultados ----------------
+def _flatten(results):
+    flat = {}
+    for section in ("micro", "e2e", "coldstart"):
+        for name, metrics in results.get(section, {}).items():
+            for key in ("p50_ms", "p95_ms", "rps", "import_main_ms"):
+                if key in metrics:
+                    flat[f"{section}.{name}.{key}"] = metrics[key]
+    return flat
+
+def compare(current, baseline, threshold):
+    """Imprime la variación contra `baseline` y devuelve la lista de regresiones."""
+    cur, base = _flatten(current), _flatten(baseline)
+    regressions = []
+    print(f"\n{'métrica':55} {'base':>12} {'actual':>12} {'cambio':>9}")
+    for key in sorted(cur):
+        if key not in base or not base[key]:
+            continue
+        change = (cur[key] - base[key]) / base[key]
+        # Para rps más alto es mejor; para latencias, más bajo
+        worse = -change if key.endswith("rps") else change
+        flag = " ⚠️" if worse > threshold else ""
+        if flag:
+            regressions.append(key)
+        print(f"{key:55} {base[key]:>12.3f} {cur[key]:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+def _latest_result(exclude=None):
+    files = sorted(p for p in RESULTS_DIR.glob("*.json") if p != exclude)
+    return files[-1] if files else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del bot contra stubs locales.")
+    parser.add_argument("--only", choices=("micro", "e2e", "coldstart"), help="Correr solo una sección")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia de los stubs en segundos")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidad de error 500 de los stubs")
+    parser.add_argument("--requests", type=int, default=200, help="Requests por endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--ticks", type=int, default=10, help="Ticks del scheduler a medir")
+    parser.add_argument("--number", type=int, default=1000, help="Iteraciones por microbenchmark")
+    parser.add_argument("--coldstarts", type=int, default=5, help="Arranques en frío a medir")
+    parser.add_argument("--compare", help="Resultado JSON contra el cual comparar (por defecto, el último)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Empeoramiento relativo considerado regresión")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    stubs = start_stubs(args.latency, args.error_rate)
+    workdir = Path(tempfile.mkdtemp(prefix="dolar-bench-"))
+    # La configuración se lee al importar config.constants: hay que fijarla antes de importar la app
+    os.environ.update({
+        "DATA_DIR": str(workdir / "data"),
+        "LOG_DIR": str(workdir / "logs"),
+        "DOLAR_API_URL": f"{stubs['dolarapi'].url}/v1/dolares",
+        "TELEGRAM_API_URL": stubs["telegram"].url,
+        "TELEGRAM_TOKEN": "bench",
+        "TELEGRAM_CHAT_ID": "1",
+        "SUPABASE_URL": stubs["supabase"].url,
+        "SUPABASE_API_KEY": "bench",
+        "HISTORY_BACKENDS": "json,csv,supabase,sqlite",
+    })
+
+    results = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        }
+    }
+    try:
+        # Primero el arranque en frío: el proceso hijo tiene que poder tomar el lock de líder
+        if args.only in (None, "coldstart"):
+            print("⏱️ Arranque en frío...")
+            results["coldstart"] = run_coldstart(args.coldstarts)
+        if args.only in (None, "micro"):
+            print("⏱️ Microbenchmarks...")
+            results["micro"] = run_micro(args.number)
+        if args.only in (None, "e2e"):
+            print("⏱️ End to end...")
+            results["e2e"] = run_e2e(args.requests, args.concurrency, args.ticks)
+    finally:
+        for stub in stubs.values():
+            stub.stop()
+
+    for section in ("coldstart", "micro", "e2e"):
+        for name, metrics in results.get(section, {}).items():
+            print(f"{section:9} {name:28} {json.dumps(metrics, ensure_ascii=False)}")
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    out = RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    out.write_text(json.dumps(results, indent=2))
+    print(f"\n💾 Resultados en {out}")
+
+    baseline_path = Path(args.compare) if args.compare else _latest_result(exclude=out)
+    if baseline_path and baseline_path.exists():
+        regressions = compare(results, json.loads(baseline_path.read_text()), args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/stubs.py
+"""
+Servidores HTTP locales que imitan dolarapi.com, la Bot API de Telegram y el
+REST de Supabase, con latencia y tasa de errores configurables.
+"""
+
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_BASE_RATES = {
+    "Oficial": (1445, 1495),
+    "Blue": (1450, 1470),
+    "Bolsa": (1476.4, 1481.3),
+    "Contado con liquidación": (1491.3, 1491.9),
+    "Mayorista": (1461, 1470),
+    "Cripto": (1514, 1520),
+    "Tarjeta": (1878.5, 1943.5),
+}
+
+class StubServer:
+    """
+    Servidor en un thread propio. `latency` (segundos) se suma a cada respuesta
+    y `error_rate` (0..1) es la probabilidad de devolver un 500.
+    """
+
+    def __init__(self, handler_cls, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler_cls)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def should_fail(self):
+        with self._lock:
+            self.requests += 1
+            return self.random.random() < self.error_rate
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _begin(self):
+        stub = self.server.stub
+        if stub.latency:
+            time.sleep(stub.latency)
+        if stub.should_fail():
+            self._reply(500, {"error": "stub error"})
+            return False
+        return True
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+class DolarApiHandler(_StubHandler):
+    """GET /v1/dolares con una pequeña caminata aleatoria en cada respuesta."""
+
+    def do_GET(self):
+        if not self._begin():
+            return
+        rnd = self.server.stub.random
+        now = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+        data = []
+        for nombre, (compra, venta) in _BASE_RATES.items():
+            drift = rnd.uniform(-5, 5)
+            data.append({
+                "moneda": "USD",
+                "casa": nombre.lower(),
+                "nombre": nombre,
+                "compra": round(compra + drift, 2),
+                "venta": round(venta + drift, 2),
+                "fechaActualizacion": now,
+            })
+        self._reply(200, data)
+
+class TelegramHandler(_StubHandler):
+    """POST /bot<token>/<método>: responde ok y devuelve un file_id para sendPhoto."""
+
+    _ids = itertools.count(1)
+
+    def do_POST(self):
+        self._read_body()
+        if not self._begin():
+            return
+        message_id = next(self._ids)
+        result = {"message_id": message_id, "chat": {"id": 1}}
+        if self.path.endswith("/sendPhoto"):
+            result["photo"] = [{"file_id": f"stub-photo-{message_id}", "width": 800, "height": 400}]
+        self._reply(200, {"ok": True, "result": result})
+
+class SupabaseHandler(_StubHandler):
+    """POST/GET /rest/v1/cotizaciones guardando las filas en memoria."""
+
+    rows = []
+
+    def do_POST(self):
+        body = self._read_body()
+        if not self._begin():
+            return
+        SupabaseHandler.rows.append(json.loads(body or b"{}"))
+        self._reply(201, {})
+
+    def do_GET(self):
+        if not self._begin():
+            return
+        self._reply(200, SupabaseHandler.rows[-1000:])
+
+def start_stubs(latency=0.0, error_rate=0.0):
+    """Levanta los tres stubs y devuelve un dict nombre -> StubServer."""
+    return {
+        "dolarapi": StubServer(DolarApiHandler, latency, error_rate, seed=1).start(),
+        "telegram": StubServer(TelegramHandler, latency, error_rate, seed=2).start(),
+        "supabase": StubServer(SupabaseHandler, latency, error_rate, seed=3).start(),
+    }
@@ -9,11 +9,19 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # --- Configuración de Archivos (Rutas Absolutas) ---
 # Ahora la ruta será correcta: /.../DOLAR-WHATSAPP/config/data/history.json
-DATA_FILE = BASE_DIR / "data" / "last_rates.json"
-HISTORY_CSV_FILE = BASE_DIR / "data" / "dolar_history.csv"
-HISTORY_JSON_FILE = BASE_DIR / "data" / "history.json"
-ERROR_LOG = Path(__file__).resolve().parent.parent / "logs" / "errors.log"
-INITIAL_RATES_FILE = BASE_DIR / "data" / "initial_rates.json" 
+# DATA_DIR / LOG_DIR se pueden cambiar por entorno (ej. un disco persistente o los benchmarks)
+DATA_DIR = Path(os.getenv("DATA_DIR", BASE_DIR / "data"))
+LOG_DIR = Path(os.getenv("LOG_DIR", BASE_DIR / "logs"))
+TEMPLATE_CACHE_DIR = Path(os.getenv("TEMPLATE_CACHE_DIR", DATA_DIR / "template_cache")) # bytecode de Jinja2
+DATA_FILE = DATA_DIR / "last_rates.json"
+HISTORY_CSV_FILE = DATA_DIR / "dolar_history.csv"
+HISTORY_JSON_FILE = DATA_DIR / "history.json"
+ERROR_LOG = LOG_DIR / "errors.log"
+INITIAL_RATES_FILE = DATA_DIR / "initial_rates.json" 
+
+# --- APIs externas (se pueden redirigir a stubs locales) ---
+DOLAR_API_URL = os.getenv("DOLAR_API_URL", "https://dolarapi.com/v1/dolares")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
 
 # --- Configuración de Telegram y Supabase ---
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
@@ -22,5 +30,49 @@ CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 CHECK_INTERVAL_MINUTES = 5
 MIN_CHANGE_THRESHOLD = 0.00001 
 
+# --- Alertas (services/alerts.py) ---
+ALERT_WINDOW_SECONDS = int(os.getenv("ALERT_WINDOW_SECONDS", 15 * 60))          # cambios acumulados en un solo resumen
+ALERT_MIN_INTERVAL_SECONDS = int(os.getenv("ALERT_MIN_INTERVAL_SECONDS", 60))   # mínimo entre dos mensajes al mismo chat
+ALERT_HYSTERESIS_PCT = float(os.getenv("ALERT_HYSTERESIS_PCT", 0.1))            # variación mínima (%) contra el último valor alertado
+
 # Tipos de Dólar (Opcional mantener aquí para referencia)
-DOLAR_TYPES = ["oficial", "blue", "mep", "ccl", "tarjeta", "cripto", "mayorista"]
\ No newline at end of file
+DOLAR_TYPES = ["oficial", "blue", "mep", "ccl", "tarjeta", "cripto", "mayorista"]
+SPARKLINE_POINTS = 48 # ticks que muestra el sparkline de cada tarjeta (4 hs con intervalos de 5 min)
+ANALYTICS_TICKS = 500 # ticks del historial que usa services/analytics.py
+ANALYTICS_WINDOW = 12 # ventana (en ticks) de la media móvil y la volatilidad: 1 h con intervalos de 5 min
+
+# --- Despliegue multi-worker ---
+# Archivo compartido con el último snapshot publicado por el worker líder (lo leen todos los workers).
+SNAPSHOT_FILE = DATA_DIR / "snapshot.json"
+# Antigüedad máxima del snapshot compartido antes de consultar la API desde la web/bot (dos intervalos de margen)
+SNAPSHOT_MAX_AGE_SECONDS = 2 * CHECK_INTERVAL_MINUTES * 60
+# Lock de elección de líder: solo el worker que lo obtiene corre los jobs del scheduler.
+# Para varias instancias en distintas máquinas debe apuntar a un volumen compartido.
+SCHEDULER_LOCK_FILE = Path(os.getenv("SCHEDULER_LOCK_FILE", DATA_DIR / "scheduler.lock"))
+LEADER_RETRY_SECONDS = 60
+# Estado durable de los jobs (última corrida y avisos enviados por día), para reinicios idempotentes
+JOB_STATE_FILE = DATA_DIR / "job_state.json"
+
+# --- Backends de historial ---
+# Destinos donde se guarda cada tick, separados por coma: json, csv, supabase, sqlite.
+HISTORY_BACKENDS = [b.strip() for b in os.getenv("HISTORY_BACKENDS", "json,csv,supabase").split(",") if b.strip()]
+SQLITE_DB_FILE = Path(os.getenv("SQLITE_DB_FILE", DATA_DIR / "history.db"))
+BACKFILL_CHECKPOINT_FILE = DATA_DIR / "backfill_checkpoint.json"
+
+# --- Retención y archivo del historial ---
+ARCHIVE_DIR = DATA_DIR / "archive"
+RETENTION_RAW_DAYS = int(os.getenv("RETENTION_RAW_DAYS", 7))                  # ticks crudos en history.json / CSV
+RETENTION_ARCHIVE_RAW_DAYS = int(os.getenv("RETENTION_ARCHIVE_RAW_DAYS", 365))  # segmentos crudos comprimidos (los rollups no se borran)
+RETENTION_INITIAL_RATES_DAYS = int(os.getenv("RETENTION_INITIAL_RATES_DAYS", 30))
+
+# --- Logging ---
+ERROR_LOG_MAX_BYTES = 1024 * 1024 # rotación por tamaño de logs/errors.log
+LOG_BACKUP_COUNT = 5
+LOG_DEDUP_SECONDS = 60            # mensajes idénticos dentro de esta ventana se suprimen
+LOG_QUEUE_SIZE = 10000
+
+# --- Readiness (/ready) ---
+# Límites a partir de los cuales el worker se reporta como no listo
+HEALTH_MAX_SNAPSHOT_AGE_SECONDS = int(os.getenv("HEALTH_MAX_SNAPSHOT_AGE_SECONDS", 3 * CHECK_INTERVAL_MINUTES * 60))
+HEALTH_MAX_UPSTREAM_ERROR_RATE = float(os.getenv("HEALTH_MAX_UPSTREAM_ERROR_RATE", 0.5))
+HEALTH_MAX_LOG_BACKLOG = LOG_QUEUE_SIZE // 2
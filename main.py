@@ -1,38 +1,37 @@
 # main.py
 
 from fastapi import FastAPI, Request, APIRouter
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 from datetime import datetime, date
 from zoneinfo import ZoneInfo
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 import random
-import requests
 
-from utils.telegram_client import TOKEN
-from utils.file_helpers import load_json, save_json
-from utils.formatters import prepare_data, emoji
-from utils.helpers import now_argentina, get_full_date, parse_tipo, time_ago
+from utils.telegram_client import send_telegram_message
+from utils.metrics import render_metrics, TEMPLATE_RENDER_SECONDS, WEBHOOK_SECONDS, WEBHOOK_INFLIGHT
+from utils.file_helpers import load_json, log_error
+from utils.formatters import prepare_data, card_views, emoji
+from utils.helpers import now_argentina, get_full_date, parse_tipo
+from utils.templating import create_templates, precompile_templates
 
 # Servicios
 from services.dolar_services import (
-    fetch_dolar_rates,
+    get_current_snapshot,
     format_message,
-    get_all_dolar_rates,
 )
 
 # Storage (persistencia)
-from storage.initial_rates import (
-    load_initial_rates,
-    save_initial_rates_by_day
-)
-from config.constants import DATA_FILE, CHECK_INTERVAL_MINUTES, HISTORY_JSON_FILE
+from storage.initial_rates import load_initial_rates
+from storage.csv_history import recent_series
+from storage.snapshot_store import shared_changes
+from services.health import readiness
+from services.chart_service import send_chart, send_summary, parse_rango
+from services.analytics import get_analytics, format_analytics_message
+from config.constants import DATA_FILE, CHECK_INTERVAL_MINUTES, SPARKLINE_POINTS
 from scheduler.main_scheduler import start_scheduler, stop_scheduler
 
-# ---------------- Config ----------------
-BASE_URL = f"https://api.telegram.org/bot{TOKEN}"
-
 # ---------------- FastAPI ----------------
 app = FastAPI(title="Dólar Argentina Bot + Web")
 
@@ -40,8 +39,8 @@ app = FastAPI(title="Dólar Argentina Bot + Web")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # ---------------- Templates ----------------
-templates = Jinja2Templates(directory="templates")
-templates.env.globals['time_ago'] = time_ago
+# Bytecode en disco y tarjetas cacheadas por versión (ver utils/templating.py)
+templates = create_templates("templates")
 
 # ---------------- Helpers (Funciones reutilizables que son web/bot-agnósticas) ----------------
 def now_argentina():
@@ -101,94 +100,73 @@ async def mock_rates(request: Request):
 
 @web_router.get("/", response_class=HTMLResponse)
 async def real_rates(request: Request):
-    data = get_all_dolar_rates() # Cotizaciones actuales
     now_dt = now_argentina()
     now = now_dt.strftime('%Y-%m-%d %H:%M')
     full_date = get_full_date()
     
-    # 1. Inicialización de variables
-    last_save_timestamp = None 
-    last_individual_updates = {} 
-    history = []
-
-    # ------------------- LECTURA AISLADA DEL HISTORIAL -------------------
     try:
-        history = load_json(HISTORY_JSON_FILE)
-        
-        # 1. Obtener el timestamp global (el último registro del historial)
-        if isinstance(history, list) and len(history) > 0 and history[-1].get("timestamp"):
-            last_save_timestamp = history[-1]["timestamp"]
-            
-        # 🚨 DIAGNÓSTICO: Muestra qué valor tomó la ruta web
-        print(f"Ruta Web: Valor leído de history.json: {last_save_timestamp}")
-            
-    except Exception as e:
-        print(f"Advertencia: Error al leer {HISTORY_JSON_FILE}: {e.__class__.__name__} - {e}")
-        pass 
-        
-    # 2. Establecer el FALLBACK (hora de la consulta) SOLO si el historial estaba vacío o falló la lectura
-    if last_save_timestamp is None:
-        last_save_timestamp = now_dt.isoformat()
-        
-    # ----------------------------------------------------------------------
-    # 3. LÓGICA CLAVE: ENCONTRAR ÚLTIMOS TIMESTAMPS INDIVIDUALES
-    # Iteramos el historial al revés (del más reciente al más antiguo)
-    # Solo guardamos el primer (último) timestamp que encontramos para cada tipo de dólar.
-    for record in reversed(history):
-        
-        # 🚨 CORRECCIÓN CRÍTICA: Ignorar registros que no son diccionarios (maneja el AttributeError)
-        if not isinstance(record, dict):
-            # No falla, simplemente salta el registro corrupto (cadena, etc.)
-            continue 
-            
-        dolar_type = record.get("tipo") 
-        timestamp = record.get("timestamp")
-        
-        # Si tiene tipo y timestamp, y no lo hemos registrado ya (porque iteramos al revés)
-        if dolar_type and timestamp and dolar_type not in last_individual_updates:
-            last_individual_updates[dolar_type] = timestamp
-            
-    # ----------------------------------------------------------------------
-
-    try:
-        today_str = date.today().isoformat()
-
-        # Cargar/Guardar aperturas
-        all_initials = load_initial_rates() 
-        save_initial_rates_by_day(data) 
-        
-        # Usar la apertura del día para los cálculos
-        initial_rates_today = all_initials.get(today_str, data)
-        prepared = prepare_data(data, initial_dict=initial_rates_today)
-
-        # 💾 Actualizar últimos valores (last_rates.json)
-        save_json(DATA_FILE, data) 
+        # Cotizaciones actuales (snapshot compartido; si está viejo se consulta la API
+        # una vez y se publica para el resto). Fuera del event loop: puede bloquear.
+        snapshot, _ = await run_in_threadpool(get_current_snapshot)
+
+        # Variaciones contra la apertura: las del tick que publicó el líder o,
+        # si el snapshot lo trajo la web, contra la apertura guardada del día.
+        # La apertura la guarda solo el líder (primer tick del día).
+        changes = shared_changes(snapshot)
+        if changes is not None:
+            prepared = card_views(changes)
+        else:
+            initial_rates_today = load_initial_rates().get(date.today().isoformat()) or snapshot
+            prepared = prepare_data(snapshot, initial_dict=initial_rates_today)
+        analytics = get_analytics(snapshot)["types"]
+        # last_rates.json lo escribe solo el líder en cada tick; un fetch de la
+        # web ya quedó publicado en el snapshot compartido.
         
     except Exception as e:
         print(f"Error procesando cotizaciones en ruta web: {e}")
         return HTMLResponse(f"⚠️ Error obteniendo cotizaciones: {e}", status_code=500)
         
-    # La variable ya tiene el valor correcto (Historial, o Fallback si el historial falló)
-    timestamp_for_cards = last_save_timestamp
-
-    # 4. Renderizar la plantilla con todas las variables necesarias
-    return templates.TemplateResponse(
-        "dolar_table.html",
-        {
-            "request": request, 
-            "title": "Cotizaciones Reales", 
-            "now": now, 
-            "full_date": full_date, 
-            "data": prepared,
-            "CHECK_INTERVAL_MINUTES": CHECK_INTERVAL_MINUTES,
-            "last_updates": last_individual_updates, # <-- ¡CLAVE para horas individuales!
-            "timestamp_for_cards": timestamp_for_cards # <-- Fallback
-        }
-    )
+    # Renderizar la plantilla con todas las variables necesarias
+    with TEMPLATE_RENDER_SECONDS.time(template="dolar_table.html"):
+        return templates.TemplateResponse(
+            "dolar_table.html",
+            {
+                "request": request, 
+                "title": "Cotizaciones Reales", 
+                "now": now, 
+                "full_date": full_date, 
+                "data": prepared,
+                "CHECK_INTERVAL_MINUTES": CHECK_INTERVAL_MINUTES,
+                # Series de los sparklines (SVG inline); el SVG se arma solo al renderizar una tarjeta
+                "sparkline_series": recent_series(SPARKLINE_POINTS),
+                "analytics": analytics,
+                # Cada tarjeta se reutiliza mientras no cambien sus propios datos
+                "cache_cards": True,
+            }
+        )
+
+# ----------- API -----------
+@web_router.get("/api/analytics")
+async def analytics_api():
+    """Brechas, spreads, media móvil, volatilidad y variación desde la apertura por tipo."""
+    try:
+        snapshot, _ = await run_in_threadpool(get_current_snapshot)
+    except Exception as e:
+        log_error(f"Error obteniendo cotizaciones para /api/analytics: {e}")
+        snapshot = None
+    return get_analytics(snapshot)
 
 # ----------- Bot Webhook -----------
 @bot_router.post("/webhook")
 async def telegram_webhook(request: Request):
+    WEBHOOK_INFLIGHT.inc()
+    try:
+        with WEBHOOK_SECONDS.time():
+            return await _handle_update(request)
+    finally:
+        WEBHOOK_INFLIGHT.dec()
+
+async def _handle_update(request: Request):
     try:
         data = await request.json()
         if "message" not in data:
@@ -208,39 +186,70 @@ async def telegram_webhook(request: Request):
                 "/dolar_ccl - Contado con Liquidación\n"
                 "/dolar_tarjeta - tarjeta\n"
                 "/dolar_cripto - cripto\n"
-                "/dolar_mayorista - mayorista"
+                "/dolar_mayorista - mayorista\n\n"
+                "📈 Gráficos:\n"
+                "/grafico [tipo] [dia|semana|mes] - evolución de la venta\n"
+                "/resumen - resumen de la jornada\n"
+                "/brecha [tipo] - brechas contra el oficial, spreads y volatilidad"
             )
             try:
-                requests.post(f"{BASE_URL}/sendMessage", data={"chat_id": chat_id, "text": help_msg, "parse_mode": "HTML"})
+                send_telegram_message(chat_id, help_msg)
+            except Exception as e:
+                print("Error enviando mensaje a Telegram:", e)
+            return {"ok": True}
+
+        # 2. Gráficos y resumen (imagen cacheada; se reenvía por file_id)
+        if text.startswith("/grafico") or text.startswith("/resumen"):
+            try:
+                # Leer el historial, dibujar el PNG y subirlo bloquea: va fuera del event loop
+                if text.startswith("/resumen"):
+                    sent = await run_in_threadpool(send_summary, chat_id)
+                else:
+                    sent = await run_in_threadpool(send_chart, chat_id, parse_tipo(text), parse_rango(text))
+                if not sent:
+                    send_telegram_message(chat_id, "Todavía no hay historial para graficar 📭")
+            except Exception as e:
+                log_error(f"Error enviando gráfico a Telegram: {e}")
+            return {"ok": True}
+
+        # 3. Brechas y spreads (cálculo cacheado por versión de snapshot)
+        if text.startswith("/brecha"):
+            try:
+                snapshot, _ = await run_in_threadpool(get_current_snapshot)
+            except Exception as e:
+                log_error(f"Error obteniendo cotizaciones de la API: {e}")
+                snapshot = None
+            try:
+                send_telegram_message(chat_id, format_analytics_message(get_analytics(snapshot), parse_tipo(text)))
             except Exception as e:
                 print("Error enviando mensaje a Telegram:", e)
             return {"ok": True}
 
-        # 2. Manejo de /dolar (se actualiza el guardado de last_rates)
+        # 4. Manejo de /dolar (variación contra el último tick del líder)
         if text.startswith("/dolar"):
-            rates_data = fetch_dolar_rates()
             tipo = parse_tipo(text)
             
-            # Cargar last_rates usando los helpers de utils/file_helpers.py
+            # last_rates.json lo escribe solo el worker líder (scheduler/tasks.py)
             last_rates = load_json(DATA_FILE) 
             
-            msg = format_message(rates_data, last_rates, tipo)
-            
-            # Guardar last_rates usando los helpers de utils/file_helpers.py
-            save_json(DATA_FILE, rates_data.get("rates", {})) 
+            try:
+                snapshot, _ = await run_in_threadpool(get_current_snapshot)
+            except Exception as e:
+                log_error(f"Error obteniendo cotizaciones de la API: {e}")
+                msg = f"No se pudo obtener la cotización ({e})"
+            else:
+                msg = format_message(snapshot, last_rates, tipo, changes=shared_changes(snapshot))
             
             try:
-                # Usar safe_send_message de utils/telegram_helpers.py sería ideal aquí, 
-                # pero mantenemos requests.post por si la integración es más compleja.
-                requests.post(f"{BASE_URL}/sendMessage", data={"chat_id": chat_id, "text": msg, "parse_mode": "HTML"})
+                send_telegram_message(chat_id, msg)
             except Exception as e:
                 print("Error enviando mensaje a Telegram:", e)
             return {"ok": True}
 
-        # 3. Respuesta por defecto
+        # 5. Respuesta por defecto
         default_msg = "No entendí ese comando. Escribí /dolar para ver las opciones 💬"
         try:
-            requests.post(f"{BASE_URL}/sendMessage", data={"chat_id": chat_id, "text": default_msg, "parse_mode": "HTML"})
+            send_telegram_message(chat_id, default_msg)
         except Exception as e:
             print("Error enviando mensaje a Telegram:", e)
         return {"ok": True}
@@ -252,6 +261,7 @@ async def telegram_webhook(request: Request):
 # ---------------- Lifespan ----------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    precompile_templates(templates)
     print("🚀 Iniciando scheduler del bot...")
     start_scheduler()
     yield
@@ -268,6 +278,18 @@ async def health(request):  # <--- ¡Añade el argumento 'request' aquí!
     # El código de tu bot sigue siendo el mismo:
     return JSONResponse(content={"status": "ok"})
 
+# Readiness: 503 si el scheduler murió, el último snapshot está viejo, la API
+# viene fallando o la cola de logs está trabada. Usa solo estado en memoria.
+@app.api_route("/ready", methods=["GET", "HEAD"])
+async def ready():
+    is_ready, report = readiness()
+    return JSONResponse(content=report, status_code=200 if is_ready else 503)
+
+# ---------------- Metrics ----------------
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # ---------------- Register Routers ----------------
 app.include_router(web_router)
 app.include_router(bot_router)
@@ -0,0 +1,183 @@
+# models/changes.py
+"""
+Motor de cambios entre snapshots consecutivos.
+
+Cada tick produce un único ChangeSet con un Change por tipo y lado (compra /
+venta): valor actual, diferencia absoluta y porcentual contra el tick anterior
+y contra la apertura del día. El historial, las alertas y la web consumen ese
+mismo resultado en lugar de recalcular las diferencias cada uno por su lado:
+el líder lo publica junto al snapshot compartido (storage/snapshot_store.py)
+y los workers web lo leen de ahí.
+"""
+
+from math import isnan
+
+from config.constants import DOLAR_TYPES
+from models.snapshot import Snapshot
+
+SIDES = ("compra", "venta")
+
+def _pct(diff, base):
+    """Variación porcentual redondeada a 2 decimales (0 si la base es 0)."""
+    return round(diff / base * 100, 2) if base else 0
+
+
+class Change:
+    """
+    Evento de cambio inmutable de un lado (compra o venta) de un tipo.
+    Si no hay valor previo o de apertura se toma el actual (diferencia 0).
+    """
+    __slots__ = ("tipo", "side", "value", "prev", "open", "diff", "pct", "diff_open", "pct_open")
+
+    def __init__(self, tipo: str, side: str, value: float, prev: float = None, open: float = None):
+        prev = value if prev is None else prev
+        open = value if open is None else open
+        for key, val in (
+            ("tipo", tipo), ("side", side), ("value", value), ("prev", prev), ("open", open),
+            ("diff", value - prev), ("pct", _pct(value - prev, prev)),
+            ("diff_open", value - open), ("pct_open", _pct(value - open, open)),
+        ):
+            object.__setattr__(self, key, val)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Change es inmutable")
+
+    def to_dict(self) -> dict:
+        return {
+            "value": self.value,
+            "prev": self.prev,
+            "diff": self.diff,
+            "pct": self.pct,
+            "open": self.open,
+            "diff_open": self.diff_open,
+            "pct_open": self.pct_open,
+        }
+
+    def __repr__(self):
+        return f"Change({self.tipo}.{self.side}={self.value}, diff={self.diff:+.2f}, diff_open={self.diff_open:+.2f})"
+
+
+class ChangeSet:
+    """
+    Cambios de un tick: {tipo: (Change compra, Change venta)} para los tipos
+    presentes en el snapshot, en el orden de DOLAR_TYPES.
+    """
+    __slots__ = ("snapshot", "previous", "opening", "opened", "_by_type")
+
+    def __init__(self, snapshot, previous=None, opening=None, opened=False):
+        by_type = {}
+        values = snapshot.values
+        prev_values = previous.values if previous is not None else None
+        open_values = opening.values if opening is not None else None
+        for i, name in enumerate(DOLAR_TYPES):
+            j = 2 * i
+            if isnan(values[j]):
+                continue
+            by_type[name] = tuple(
+                Change(
+                    name, side, values[j + k],
+                    _value(prev_values, j + k),
+                    _value(open_values, j + k),
+                )
+                for k, side in enumerate(SIDES)
+            )
+        for key, val in (
+            ("snapshot", snapshot), ("previous", previous), ("opening", opening),
+            ("opened", opened), ("_by_type", by_type),
+        ):
+            object.__setattr__(self, key, val)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ChangeSet es inmutable")
+
+    # ---------------- Acceso ----------------
+    def get(self, name: str, default=None):
+        """(Change compra, Change venta) del tipo `name`, o `default` si no vino en el tick."""
+        return self._by_type.get(name, default)
+
+    def items(self):
+        return self._by_type.items()
+
+    def __iter__(self):
+        """Todos los Change del tick (compra y venta de cada tipo)."""
+        for pair in self._by_type.values():
+            yield from pair
+
+    def __len__(self) -> int:
+        return len(self._by_type)
+
+    def changed(self, threshold: float):
+        """Tipos con una variación contra el tick anterior >= threshold en compra o venta."""
+        return [
+            name for name, (compra, venta) in self._by_type.items()
+            if abs(compra.diff) >= threshold or abs(venta.diff) >= threshold
+        ]
+
+    # ---------------- Serialización ----------------
+    def to_dict(self) -> dict:
+        return {
+            name: {change.side: change.to_dict() for change in pair}
+            for name, pair in self._by_type.items()
+        }
+
+    @classmethod
+    def from_dict(cls, snapshot, data: dict, opened=False):
+        """
+        Reconstruye el ChangeSet publicado por el líder (ver to_dict) sobre
+        `snapshot`: el anterior y la apertura salen de "prev" y "open" de cada lado.
+        """
+        previous, opening = {}, {}
+        for name, sides in (data or {}).items():
+            try:
+                previous[name] = {side: sides[side]["prev"] for side in SIDES}
+                opening[name] = {side: sides[side]["open"] for side in SIDES}
+            except (KeyError, TypeError):
+                continue
+        return cls(
+            snapshot,
+            Snapshot.from_rates(previous, timestamp=snapshot.timestamp),
+            Snapshot.from_rates(opening, timestamp=snapshot.timestamp),
+            opened,
+        )
+
+    def __repr__(self):
+        return f"ChangeSet(version={self.snapshot.version}, tipos={list(self._by_type)})"
+
+
+def _value(values, i):
+    if values is None or isnan(values[i]):
+        return None
+    return values[i]
+
+
+def diff_snapshots(current, previous=None, opening=None) -> ChangeSet:
+    """Compara `current` contra el snapshot anterior y el de apertura (ambos opcionales)."""
+    return ChangeSet(current, previous, opening)
+
+
+class ChangeDetector:
+    """
+    Recibe los snapshots de cada tick en orden y devuelve su ChangeSet.
+
+    Guarda solo referencias a snapshots inmutables: el anterior (con los tipos
+    faltantes completados desde el previo) y la apertura del día, que se toma
+    del primer snapshot de cada jornada.
+    """
+
+    def __init__(self, previous=None, opening=None):
+        self.previous = previous
+        self.opening = opening
+
+    def update(self, snapshot) -> ChangeSet:
+        opening, opened = self.opening, False
+        if opening is None or opening.timestamp.date() != snapshot.timestamp.date():
+            opening, opened = snapshot, True
+        else:
+            # Un tipo que no vino en el primer tick abre con su primer valor del día
+            opening = opening.fill_missing(snapshot)
+
+        changes = ChangeSet(snapshot, self.previous, opening, opened)
+        # Un único reemplazo por tick: los tipos que no vinieron conservan su último valor
+        self.previous = snapshot.fill_missing(self.previous)
+        self.opening = opening
+        return changes
@@ -0,0 +1,176 @@
+# models/snapshot.py
+
+from array import array
+from datetime import datetime
+from itertools import count
+from math import isnan
+from zoneinfo import ZoneInfo
+
+from config.constants import DOLAR_TYPES
+
+ARGENTINA_TZ = ZoneInfo("America/Argentina/Buenos_Aires")
+
+# Posición fija de cada tipo dentro del array de valores (compra, venta, compra, venta, ...)
+_INDEX = {name: i for i, name in enumerate(DOLAR_TYPES)}
+_NAN = float("nan")
+
+# Contador global de versiones: cada snapshot nuevo recibe un número mayor que el anterior.
+_versions = count(1)
+
+
+class Quote:
+    """
+    Cotización inmutable (compra/venta) de un tipo de dólar.
+    Usa __slots__ para no cargar un __dict__ por instancia.
+    """
+    __slots__ = ("compra", "venta")
+
+    def __init__(self, compra: float, venta: float):
+        object.__setattr__(self, "compra", float(compra))
+        object.__setattr__(self, "venta", float(venta))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Quote es inmutable")
+
+    @property
+    def promedio(self) -> float:
+        return (self.compra + self.venta) / 2
+
+    def to_dict(self) -> dict:
+        return {"compra": self.compra, "venta": self.venta, "promedio": self.promedio}
+
+    def __eq__(self, other):
+        return isinstance(other, Quote) and self.compra == other.compra and self.venta == other.venta
+
+    def __hash__(self):
+        return hash((self.compra, self.venta))
+
+    def __repr__(self):
+        return f"Quote(compra={self.compra}, venta={self.venta})"
+
+
+class Snapshot:
+    """
+    Foto inmutable de las siete cotizaciones en un instante.
+
+    Los valores se guardan en un único array('d') de 2 * len(DOLAR_TYPES) posiciones
+    (NaN = tipo ausente), así que un snapshot ocupa unos pocos cientos de bytes y
+    puede compartirse por referencia entre servicios, storage y formatters.
+    El formateo a texto se hace recién al renderizar (ver utils.formatters).
+    """
+    __slots__ = ("_values", "timestamp", "source_time", "version")
+
+    def __init__(self, values: array, timestamp: datetime = None, source_time: datetime = None):
+        object.__setattr__(self, "_values", values)
+        object.__setattr__(self, "timestamp", timestamp or datetime.now(ARGENTINA_TZ))
+        object.__setattr__(self, "source_time", source_time)
+        object.__setattr__(self, "version", next(_versions))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Snapshot es inmutable")
+
+    # ---------------- Constructores ----------------
+    @classmethod
+    def from_rates(cls, rates: dict, timestamp: datetime = None, source_time: datetime = None):
+        """
+        Crea un snapshot desde el formato dict histórico:
+        {"blue": {"compra": .., "venta": ..}, ...} o {"blue": 1450, ...}.
+        Los tipos desconocidos o con valores inválidos se ignoran.
+        """
+        values = array("d", [_NAN]) * (2 * len(DOLAR_TYPES))
+        for name, info in (rates or {}).items():
+            i = _INDEX.get(name)
+            if i is None:
+                continue
+            try:
+                if isinstance(info, dict):
+                    compra, venta = float(info["compra"]), float(info["venta"])
+                else:
+                    compra = venta = float(info)
+            except (TypeError, ValueError, KeyError):
+                continue
+            values[2 * i] = compra
+            values[2 * i + 1] = venta
+        return cls(values, timestamp, source_time)
+
+    @classmethod
+    def coerce(cls, data):
+        """Devuelve `data` si ya es un Snapshot; si es un dict de rates lo convierte."""
+        if data is None or isinstance(data, Snapshot):
+            return data
+        return cls.from_rates(data)
+
+    # ---------------- Acceso ----------------
+    def get(self, name: str, default=None):
+        """Devuelve la Quote del tipo `name` o `default` si no está presente."""
+        i = _INDEX.get(name)
+        if i is None:
+            return default
+        compra = self._values[2 * i]
+        if isnan(compra):
+            return default
+        return Quote(compra, self._values[2 * i + 1])
+
+    def __getitem__(self, name: str) -> Quote:
+        quote = self.get(name)
+        if quote is None:
+            raise KeyError(name)
+        return quote
+
+    def __contains__(self, name) -> bool:
+        i = _INDEX.get(name)
+        return i is not None and not isnan(self._values[2 * i])
+
+    def names(self):
+        """Tipos presentes, en el orden de DOLAR_TYPES."""
+        return [name for name in DOLAR_TYPES if name in self]
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __len__(self) -> int:
+        return len(self.names())
+
+    def items(self):
+        for name in self.names():
+            yield name, self.get(name)
+
+    @property
+    def values(self) -> array:
+        """Array crudo (compra, venta) por tipo, en el orden de DOLAR_TYPES. No modificar."""
+        return self._values
+
+    @property
+    def updated_at(self) -> str:
+        """Fecha de actualización informada por la API, en hora Argentina."""
+        if not self.source_time:
+            return "desconocida"
+        return self.source_time.astimezone(ARGENTINA_TZ).strftime("%d/%m/%Y %H:%M")
+
+    def fill_missing(self, other):
+        """
+        Devuelve un snapshot con los tipos ausentes completados desde `other`.
+        Si no falta nada (o `other` es None) devuelve el mismo objeto, sin copiar.
+        """
+        if other is None:
+            return self
+        missing = [i for i in range(0, len(self._values), 2) if isnan(self._values[i]) and not isnan(other._values[i])]
+        if not missing:
+            return self
+        values = array("d", self._values)
+        for i in missing:
+            values[i] = other._values[i]
+            values[i + 1] = other._values[i + 1]
+        return Snapshot(values, self.timestamp, self.source_time)
+
+    # ---------------- Serialización ----------------
+    def to_dict(self) -> dict:
+        """Formato dict usado por los archivos JSON (last_rates.json, initial_rates.json)."""
+        return {name: quote.to_dict() for name, quote in self.items()}
+
+    def to_result(self) -> dict:
+        """Formato legado de fetch_dolar_rates(): {"rates": {...}, "updated_at": "..."}."""
+        return {"rates": self.to_dict(), "updated_at": self.updated_at}
+
+    def __repr__(self):
+        return f"Snapshot(version={self.version}, timestamp={self.timestamp.isoformat()}, tipos={self.names()})"
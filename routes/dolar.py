@@ -1,17 +1,17 @@
 from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
-from io import BytesIO
-import matplotlib.pyplot as plt
-import pandas as pd
+from fastapi.responses import Response
 import os
 from datetime import datetime
 
 from services.dolar_services import fetch_dolar_rates, format_message
+from storage.csv_history import recent_series
+from utils.charts import line_chart_svg, line_chart_png
+from config.constants import HISTORY_CSV_FILE
 
 router = APIRouter(prefix="/dolar", tags=["Dólar"])
 
 # Archivo donde se guardará el historial completo
-HISTORY_FILE = "data/dolar_history.csv"
+HISTORY_FILE = HISTORY_CSV_FILE
 os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
 
 # Tipos de dólar que queremos registrar
@@ -28,6 +28,8 @@ def log_rates(rates: dict):
         except (ValueError, TypeError):
             row[tipo] = 0
 
+    import pandas as pd # diferido: pandas solo se carga si se usa esta ruta
+
     file_exists = os.path.isfile(HISTORY_FILE)
     df = pd.DataFrame([row])
     df.to_csv(HISTORY_FILE, mode='a', header=not file_exists, index=False)
@@ -41,37 +43,18 @@ async def get_dolar_rates():
     return {"rates": data, "message": message}
 
 @router.get("/grafico")
-async def grafico_dolar():
-    if not os.path.isfile(HISTORY_FILE):
+async def grafico_dolar(tipo: str | None = None, formato: str = "png", limit: int = 100):
+    """
+    Gráfico de la venta de los últimos `limit` ticks (todos los tipos, o solo
+    `tipo`). `formato` es "png" (por defecto) o "svg".
+    """
+    series = recent_series(limit)
+    if tipo:
+        series = {name: data for name, data in series.items() if name == tipo}
+    if not series:
         return {"error": "No hay historial aún."}
-    
-    df = pd.read_csv(HISTORY_FILE, parse_dates=["timestamp"]).tail(100)
-    plt.figure(figsize=(10,5))
-    
-    colors = {
-        "oficial": "green",
-        "blue": "blue",
-        "mep": "orange",
-        "ccl": "purple",
-        "tarjeta": "red",
-        "cripto": "cyan",
-        "mayorista": "brown"
-    }
 
-    for tipo in DOLAR_TYPES:
-        if tipo in df.columns:
-            plt.plot(df["timestamp"], df[tipo], label=tipo.title(), color=colors.get(tipo, "black"), linewidth=2)
-    
-    plt.title("📈 Evolución del Dólar (últimas 100 actualizaciones)")
-    plt.xlabel("Hora")
-    plt.ylabel("Precio (ARS)")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    
-    buf = BytesIO()
-    plt.savefig(buf, format="png")
-    plt.close()
-    buf.seek(0)
-    
-    return StreamingResponse(buf, media_type="image/png")
+    title = f"Evolución del Dólar (últimas {limit} actualizaciones)"
+    if formato == "svg":
+        return Response(line_chart_svg(series, title=title), media_type="image/svg+xml")
+    return Response(line_chart_png(series, title=title), media_type="image/png")
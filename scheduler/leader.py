@@ -0,0 +1,63 @@
+# scheduler/leader.py
+
+import os
+
+from config.constants import SCHEDULER_LOCK_FILE
+from utils.file_helpers import ensure_dirs, log_error
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Descriptor del lock; se mantiene abierto mientras el proceso sea líder.
+# Si el proceso muere, el sistema operativo libera el lock y otro worker lo toma.
+_lock_fd = None
+
+def try_acquire_leadership() -> bool:
+    """
+    Intenta tomar el lock de líder sin bloquear.
+    Devuelve True si este proceso es (o ya era) el líder.
+    """
+    global _lock_fd
+    if _lock_fd is not None:
+        return True
+
+    ensure_dirs(SCHEDULER_LOCK_FILE)
+    fd = os.open(SCHEDULER_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        os.close(fd)
+        return False
+
+    # Dejamos el PID del líder en el archivo para diagnóstico
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    _lock_fd = fd
+    return True
+
+def release_leadership():
+    """Libera el lock de líder (si este proceso lo tenía)."""
+    global _lock_fd
+    if _lock_fd is None:
+        return
+    try:
+        if fcntl:
+            fcntl.flock(_lock_fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(_lock_fd, 0, os.SEEK_SET)
+            msvcrt.locking(_lock_fd, msvcrt.LK_UNLCK, 1)
+    except OSError as e:
+        log_error(f"Error liberando el lock del scheduler: {e}")
+    finally:
+        os.close(_lock_fd)
+        _lock_fd = None
+
+def is_leader() -> bool:
+    """True si este proceso tiene el lock de líder."""
+    return _lock_fd is not None
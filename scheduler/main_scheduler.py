@@ -1,40 +1,124 @@
 # scheduler/main_scheduler.py
 
+import os
+from datetime import date, datetime, timedelta, timezone
 from apscheduler.schedulers.background import BackgroundScheduler
-from .tasks import check_and_save_dolar, send_daily_summary, reset_flags, last_rates
-from config.constants import CHECK_INTERVAL_MINUTES
+from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_MISSED
+from .tasks import check_and_save_dolar, send_daily_summary, reset_flags, set_last_snapshot, restore_tick_state
+from .leader import try_acquire_leadership, release_leadership
+from storage.retention import run_retention
+from storage.initial_rates import load_initial_rates
+from storage import job_state
+from utils.helpers import now_argentina
+from utils.metrics import SCHEDULER_LAG_SECONDS, SCHEDULER_JOBS_TOTAL
+from config.constants import CHECK_INTERVAL_MINUTES, LEADER_RETRY_SECONDS
 from utils.file_helpers import load_json
 from config.constants import DATA_FILE
 
-scheduler = BackgroundScheduler()
+# coalesce: si el proceso estuvo trabado, las corridas atrasadas de un job se
+# juntan en una sola; max_instances evita ticks superpuestos.
+scheduler = BackgroundScheduler(job_defaults={"coalesce": True, "max_instances": 1})
+
+DAILY_SUMMARY_HOUR, DAILY_SUMMARY_MINUTE = 17, 1
+
+def _on_job_event(event):
+    """
+    Registra en /metrics la demora de arranque y el resultado de cada job, y
+    guarda la última corrida en el estado durable (storage/job_state.py).
+    """
+    if event.code == EVENT_JOB_SUBMITTED:
+        lag = (datetime.now(timezone.utc) - max(event.scheduled_run_times)).total_seconds()
+        SCHEDULER_LAG_SECONDS.observe(max(lag, 0), job=event.job_id)
+        return
+
+    outcome = {EVENT_JOB_EXECUTED: "executed", EVENT_JOB_ERROR: "error", EVENT_JOB_MISSED: "missed"}[event.code]
+    SCHEDULER_JOBS_TOTAL.inc(job=event.job_id, outcome=outcome)
+    # Solo las corridas reales cuentan como última corrida. La elección de líder
+    # corre en los seguidores: solo el líder escribe el estado de jobs.
+    if event.code != EVENT_JOB_MISSED and event.job_id != "leader_election_job":
+        job_state.record_run(event.job_id, event.scheduled_run_time, outcome)
+
+scheduler.add_listener(_on_job_event, EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
 
 def start_scheduler():
-    """Inicializa el estado y arranca todos los jobs del scheduler."""
+    """
+    Arranca el scheduler. Con varios workers (uvicorn --workers N) solo el que
+    obtiene el lock de líder corre los jobs; el resto queda reintentando el lock
+    cada LEADER_RETRY_SECONDS y lee el snapshot compartido que publica el líder.
+    """
+    scheduler.start()
+
+    if try_acquire_leadership():
+        _start_leader_jobs()
+    else:
+        print("👥 Otro worker es el líder del scheduler. Esperando el lock...")
+        scheduler.add_job(_retry_leadership, "interval", seconds=LEADER_RETRY_SECONDS, id="leader_election_job")
+
+def _retry_leadership():
+    """Job de los workers seguidores: si el líder murió, toma su lugar."""
+    if try_acquire_leadership():
+        scheduler.remove_job("leader_election_job")
+        _start_leader_jobs()
+
+def _start_leader_jobs():
+    """Inicializa el estado y programa todos los jobs (solo en el worker líder)."""
     
-    # 1. Inicialización de estado (Cargar la última cotización)
-    # Se actualiza el diccionario global 'last_rates' importado de tasks.py
-    last_rates.update(load_json(DATA_FILE))
+    # 1. Inicialización de estado (Cargar la última cotización y la apertura de hoy)
+    # Se inicializa el detector de cambios de tasks.py
+    set_last_snapshot(load_json(DATA_FILE), load_initial_rates().get(date.today().isoformat()))
+    # El readiness parte del último tick persistido hasta que corra el primero
+    restore_tick_state(job_state.last_finished("dolar_check_job"))
     
     # 2. Programación de jobs
-    # Job de chequeo periódico
-    scheduler.add_job(check_and_save_dolar, "interval", minutes=CHECK_INTERVAL_MINUTES, id="dolar_check_job")
+    # Job de chequeo periódico. La primera corrida va en el pool del scheduler:
+    # el arranque no espera a la API y la web responde mientras tanto con el
+    # último snapshot persistido. Si el último tick terminó hace menos de un
+    # intervalo (reinicio rápido), se respeta el ritmo en lugar de repetirlo.
+    scheduler.add_job(
+        check_and_save_dolar, "interval", minutes=CHECK_INTERVAL_MINUTES, id="dolar_check_job",
+        next_run_time=_resume_time("dolar_check_job", timedelta(minutes=CHECK_INTERVAL_MINUTES)),
+        misfire_grace_time=CHECK_INTERVAL_MINUTES * 60 // 2,
+    )
     
-    # Job de resumen al cierre (17:01 hs)
-    scheduler.add_job(send_daily_summary, "cron", hour=17, minute=1, timezone='America/Argentina/Buenos_Aires', id="daily_summary_job")
+    # Job de resumen al cierre (17:01 hs). Si la instancia estaba dormida a esa
+    # hora y el resumen de hoy no salió, corre apenas arranca (send_daily_summary
+    # no lo repite si ya se envió).
+    summary_kwargs = {"next_run_time": datetime.now(timezone.utc)} if _missed_daily_summary(now_argentina()) else {}
+    scheduler.add_job(
+        send_daily_summary, "cron", hour=DAILY_SUMMARY_HOUR, minute=DAILY_SUMMARY_MINUTE,
+        timezone='America/Argentina/Buenos_Aires', id="daily_summary_job",
+        misfire_grace_time=6 * 3600, **summary_kwargs,
+    )
     
-    # Job de reseteo de flags (00:01 hs)
-    scheduler.add_job(reset_flags, "cron", hour=0, minute=1, timezone='America/Argentina/Buenos_Aires', id="reset_flags_job")
+    # Job de limpieza de marcas de avisos de días anteriores (00:01 hs)
+    scheduler.add_job(reset_flags, "cron", hour=0, minute=1, timezone='America/Argentina/Buenos_Aires', id="reset_flags_job", misfire_grace_time=6 * 3600)
     
-    # 3. Arranque
-    scheduler.start()
-    print("✅ Scheduler iniciado")
+    # Job de retención/archivo del historial (03:00 hs, fuera del horario de mercado)
+    scheduler.add_job(run_retention, "cron", hour=3, minute=0, timezone='America/Argentina/Buenos_Aires', id="retention_job", misfire_grace_time=3 * 3600)
     
-    # Primer chequeo inmediato para cargar datos
-    check_and_save_dolar() 
+    print(f"✅ Scheduler iniciado (líder, PID {os.getpid()})")
+
+def _resume_time(job_id, interval):
+    """
+    Próxima corrida de un job de intervalo después de un arranque: ahora, o
+    un intervalo después de su última corrida persistida si todavía no pasó.
+    """
+    now = datetime.now(timezone.utc)
+    finished = job_state.last_finished(job_id)
+    if finished is None:
+        return now
+    # El tope de un intervalo cubre relojes desfasados entre reinicios
+    return min(max(now, finished + interval), now + interval)
+
+def _missed_daily_summary(now):
+    """True si ya pasó la hora del resumen de hoy y todavía no se envió."""
+    due = now.replace(hour=DAILY_SUMMARY_HOUR, minute=DAILY_SUMMARY_MINUTE, second=0, microsecond=0)
+    return now >= due and not job_state.flag_sent(now.date(), "daily_summary_sent")
 
 def stop_scheduler():
-    """Detiene el scheduler."""
+    """Detiene el scheduler y libera el lock de líder."""
     scheduler.shutdown()
+    release_leadership()
 
 if __name__ == '__main__':
     # Esto permite ejecutar el scheduler directamente si es necesario
@@ -1,52 +1,86 @@
 # scheduler/tasks.py
 
+import time
+from functools import partial
 from zoneinfo import ZoneInfo
 from datetime import datetime
 
 # Lógica de servicio
-from services.dolar_services import fetch_dolar_rates 
+from services.dolar_services import fetch_snapshot
+from models.snapshot import Snapshot
+from models.changes import ChangeDetector
 # Clientes de Storage
 from storage.supabase_client import insertar_cotizacion_supabase
 from storage.csv_history import append_to_csv
+from storage.initial_rates import save_initial_rates_by_day
+from storage import job_state
 from storage.json_history import append_to_json_history
+from storage.snapshot_store import publish_snapshot
+from storage.sqlite_history import insert_rows
 from utils.file_helpers import log_error, save_json
-from utils.telegram_helpers import safe_send_message
-from utils.formatters import emoji
-from config.constants import DATA_FILE, MIN_CHANGE_THRESHOLD
+from utils.helpers import now_argentina
+from services.alerts import coalescer
+from utils.metrics import SCHEDULER_TICK_SECONDS, STORAGE_WRITE_SECONDS
+from config.constants import DATA_FILE, MIN_CHANGE_THRESHOLD, HISTORY_BACKENDS
 
 # Variables globales para el estado del scheduler
-last_rates = {}
-market_open_sent = False
-market_close_sent = False
-
-def check_and_save_dolar():
+detector = ChangeDetector() # Snapshot anterior y apertura del día; calcula los cambios de cada tick
+last_snapshot = None # Último Snapshot procesado (inmutable, se reemplaza en cada tick)
+# Los avisos de apertura/cierre/resumen ya enviados se guardan por día en storage/job_state.py
+
+# Estado del último tick, en memoria, para el readiness de /ready (ver services/health.py).
+# Los tiempos son time.time(); None mientras no haya ocurrido.
+tick_state = {
+    "started_at": None,   # inicio del último tick (también los que salen por fuera de horario)
+    "finished_at": None,  # fin del último tick; si es menor que started_at, hay uno en curso
+    "duration": None,     # duración en segundos del último tick terminado
+    "last_success": None, # último tick que obtuvo y guardó cotizaciones
+    "last_error": None,   # mensaje del último error de fetch
+}
+
+def check_and_save_dolar(now=None):
     """
     Lógica principal ejecutada periódicamente:
     1. Verifica horario de mercado.
     2. Obtiene las cotizaciones.
     3. Compara cambios.
     4. Guarda en historial (JSON/CSV/Supabase).
-    5. Envía alerta a Telegram si hay cambios significativos.
-    """
-    global last_rates, market_open_sent, market_close_sent
+    5. Acumula los cambios significativos y envía las alertas que correspondan
+       (agrupadas por services/alerts.py).
 
+    `now` permite simular la hora del tick (benchmarks); por defecto es la hora actual.
+    """
+    tick_state["started_at"] = time.time()
+    start = time.perf_counter()
     # Usar hora local de Argentina
-    now = datetime.now(ZoneInfo("America/Argentina/Buenos_Aires"))
-
-    # 🔁 Reiniciar banderas cada nuevo día antes de las 10:00
-    if now.hour < 10:
-        market_open_sent = False
-        market_close_sent = False
-
-    # 🏦 Apertura
-    if now.hour == 10 and not market_open_sent:
-        safe_send_message("🏦 ¡El mercado abrió! Comenzando monitoreo de cotizaciones...")
-        market_open_sent = True
+    now = now or datetime.now(ZoneInfo("America/Argentina/Buenos_Aires"))
+    try:
+        with SCHEDULER_TICK_SECONDS.time():
+            _run_tick(now)
+            # 📲 Un mensaje por chat con los avisos y cambios acumulados que ya corresponde enviar
+            coalescer.flush(now.timestamp())
+    finally:
+        tick_state["duration"] = time.perf_counter() - start
+        tick_state["finished_at"] = time.time()
+
+def _run_tick(now):
+    global last_snapshot
+    today = now.date()
+
+    # 🏦 Apertura (una vez por día, aunque el proceso se reinicie). La marca se
+    # guarda cuando el aviso sale de verdad: si el envío falla, se reintenta.
+    if now.hour == 10 and not job_state.flag_sent(today, "market_open_sent"):
+        coalescer.notice(
+            "🏦 ¡El mercado abrió! Comenzando monitoreo de cotizaciones...",
+            on_sent=partial(job_state.mark_sent, today, "market_open_sent"),
+        )
 
     # 🏛️ Cierre
-    if now.hour == 17 and not market_close_sent:
-        safe_send_message("🏛️ ¡El mercado cerró! Monitoreo finalizado por hoy.")
-        market_close_sent = True
+    if now.hour == 17 and not job_state.flag_sent(today, "market_close_sent"):
+        coalescer.notice(
+            "🏛️ ¡El mercado cerró! Monitoreo finalizado por hoy.",
+            on_sent=partial(job_state.mark_sent, today, "market_close_sent"),
+        )
 
     # ⏸️ Si el mercado no está abierto, salir
     if not (10 <= now.hour < 17):
@@ -54,89 +88,114 @@ def check_and_save_dolar():
 
     # 💰 Fetch de cotizaciones
     try:
-        data = fetch_dolar_rates()
-        rates = data.get("rates", {})
-        timestamp = now.isoformat()
+        snapshot = fetch_snapshot()
+        timestamp = snapshot.timestamp.isoformat()
     except Exception as e:
         log_error(f"Error obteniendo cotizaciones: {e}")
+        tick_state["last_error"] = str(e)
         return
 
-    messages = []
+    # 📈 Un único cálculo de cambios por tick (vs. tick anterior y vs. apertura)
+    changes = detector.update(snapshot)
+    if changes.opened:
+        save_initial_rates_by_day(changes.opening.to_dict())
+
     csv_rows = []
+    changed_rows = []
+    changed = set(changes.changed(MIN_CHANGE_THRESHOLD))
+    coalescer.add(changes)
 
-    # 📈 Guardado histórico y comparación
-    for name, info in rates.items():
-        try:
-            compra = float(info["compra"])
-            venta = float(info["venta"])
-        except (TypeError, ValueError, KeyError):
-            continue
-
-        last = last_rates.get(name, {})
-        last_compra = last.get("compra", compra)
-        last_venta = last.get("venta", venta)
-
-        # Cálculo de diferencias
-        diff_compra = compra - last_compra
-        diff_venta = venta - last_venta
-        pct_compra = round((diff_compra / last_compra) * 100, 2) if last_compra else 0
-        pct_venta = round((diff_venta / last_venta) * 100, 2) if last_venta else 0
-        
+    # Guardado histórico a partir de los eventos de cambio
+    for name, (compra, venta) in changes.items():
         # Objeto de datos completo para guardado
         storage_data = {
             "timestamp": timestamp,
-            "compra": compra,
-            "venta": venta,
-            "diff_compra": diff_compra,
-            "diff_venta": diff_venta,
-            "pct_compra": pct_compra,
-            "pct_venta": pct_venta
+            "compra": compra.value,
+            "venta": venta.value,
+            "diff_compra": compra.diff,
+            "diff_venta": venta.diff,
+            "pct_compra": compra.pct,
+            "pct_venta": venta.pct
         }
 
-
         # Prepara fila para CSV (solo las columnas necesarias)
         csv_rows.append({
             "timestamp": timestamp,
             "dolar_name": name,
-            "compra": compra,
-            "venta": venta,
-            "diff_compra": diff_compra,
-            "diff_venta": diff_venta
+            "compra": compra.value,
+            "venta": venta.value,
+            "diff_compra": compra.diff,
+            "diff_venta": venta.diff
         })
 
-        # Evalúa si hubo cambio significativo para alerta
-        if abs(diff_compra) >= MIN_CHANGE_THRESHOLD or abs(diff_venta) >= MIN_CHANGE_THRESHOLD:
-            msg = (
-                f"{name.title()}\n"
-                f"   Compra: {emoji(diff_compra)} ${compra:.2f} ({diff_compra:+.2f}, {pct_compra:+.2f}%)\n"
-                f"   Venta:  {emoji(diff_venta)} ${venta:.2f} ({diff_venta:+.2f}, {pct_venta:+.2f}%)"
-            )
-            messages.append(msg)
-
-            # 💾 Guardado de Historial (Multiples destinos)
-            insertar_cotizacion_supabase(name, **storage_data)
-            append_to_json_history(name, storage_data)
+        # Solo los tipos que cambiaron van a los historiales por evento
+        if name in changed:
+            # 💾 Guardado de Historial (Multiples destinos, según HISTORY_BACKENDS)
+            if "supabase" in HISTORY_BACKENDS:
+                with STORAGE_WRITE_SECONDS.time(sink="supabase"):
+                    insertar_cotizacion_supabase(name, **storage_data)
+            if "json" in HISTORY_BACKENDS:
+                with STORAGE_WRITE_SECONDS.time(sink="json"):
+                    append_to_json_history(name, storage_data)
+            changed_rows.append({"dolar_name": name, **storage_data})
 
-        # Actualiza el estado de la última cotización (se hace siempre)
-        last_rates[name] = {"compra": compra, "venta": venta}
+    # Estado publicado del último tick (el detector ya completó los tipos faltantes)
+    last_snapshot = detector.previous
 
     # 🧾 Guardar CSV histórico (se llama una sola vez con todos los rows)
-    append_to_csv(csv_rows)
-
-    # 💾 Guardar últimos rates en JSON
-    save_json(DATA_FILE, last_rates)
+    if "csv" in HISTORY_BACKENDS:
+        with STORAGE_WRITE_SECONDS.time(sink="csv"):
+            append_to_csv(csv_rows)
+
+    # 🗄️ SQLite: todas las filas del tick en una sola transacción
+    if "sqlite" in HISTORY_BACKENDS:
+        with STORAGE_WRITE_SECONDS.time(sink="sqlite"):
+            insert_rows(changed_rows)
+
+    # 💾 Guardar últimos rates en JSON y publicar el snapshot (con los cambios del tick) para el resto de los workers
+    with STORAGE_WRITE_SECONDS.time(sink="last_rates"):
+        save_json(DATA_FILE, last_snapshot.to_dict())
+    with STORAGE_WRITE_SECONDS.time(sink="snapshot"):
+        publish_snapshot(last_snapshot, changes)
+    tick_state["last_success"] = time.time()
+
+def restore_tick_state(finished):
+    """
+    Al tomar el liderazgo, toma como último tick el que terminó a las
+    `finished` (datetime, de storage/job_state.py) si este proceso todavía no
+    corrió ninguno. El primer tick puede esperar hasta un intervalo para
+    respetar el ritmo (ver _resume_time) y mientras tanto /ready no debe
+    tomar al líder nuevo como trabado.
+    """
+    if finished is None or tick_state["started_at"] is not None:
+        return
+    ts = finished.timestamp()
+    # Sin la hora de inicio real: inicio = fin, así no figura un tick en curso
+    tick_state["started_at"] = tick_state["finished_at"] = ts
 
-    # 📲 Enviar mensaje si hubo cambios
-    if messages:
-        safe_send_message("🚨 **Actualización Dólar** 🚨\n\n" + "\n\n".join(messages))
+def set_last_snapshot(rates, opening=None):
+    """
+    Inicializa el estado con las últimas cotizaciones persistidas (dict o Snapshot)
+    y, si se conoce, la apertura del día, para no tomar como apertura el primer
+    tick después de un reinicio.
+    """
+    global detector, last_snapshot
+    last_snapshot = Snapshot.coerce(rates) if rates else None
+    detector = ChangeDetector(last_snapshot, Snapshot.coerce(opening) if opening else None)
 
-def send_daily_summary():
-    """Tarea para enviar un resumen diario al cierre del mercado."""
-    safe_send_message("📊 Resumen diario de cotizaciones")
-    check_and_save_dolar()
+def send_daily_summary(now=None):
+    """
+    Tarea para enviar un resumen diario al cierre del mercado. Es idempotente:
+    si el resumen de hoy ya salió (ej. corrida de recuperación después de un
+    reinicio) no hace nada. La marca se guarda cuando el mensaje sale.
+    """
+    now = now or now_argentina()
+    today = now.date()
+    if job_state.flag_sent(today, "daily_summary_sent"):
+        return
+    coalescer.notice("📊 Resumen diario de cotizaciones", on_sent=partial(job_state.mark_sent, today, "daily_summary_sent"))
+    check_and_save_dolar(now)
 
 def reset_flags():
-    """Tarea para reiniciar las banderas de apertura/cierre al inicio del día."""
-    global market_open_sent, market_close_sent
-    market_open_sent = False
-    market_close_sent = False
\ No newline at end of file
+    """Tarea diaria: descarta las marcas de avisos enviados de días anteriores."""
+    job_state.prune_days(now_argentina().date())
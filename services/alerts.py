@@ -0,0 +1,164 @@
+# services/alerts.py
+"""
+Alertas de cambios agrupadas por chat.
+
+En lugar de mandar un mensaje por tick, los cambios de cada tick se acumulan
+y se envían en un único resumen con todos los tipos que se movieron:
+
+- La primera alerta después de un rato sin envíos sale en el mismo tick
+  (no se espera a que termine la ventana).
+- Las siguientes se acumulan durante ALERT_WINDOW_SECONDS y salen juntas.
+- Histéresis: un tipo entra al resumen solo si se alejó al menos
+  ALERT_HYSTERESIS_PCT del último valor alertado; si fue y volvió dentro de
+  la ventana (o oscila alrededor del mismo valor) no se vuelve a avisar.
+- Ningún chat recibe dos mensajes a menos de ALERT_MIN_INTERVAL_SECONDS.
+  Los avisos de apertura y cierre respetan solo ese mínimo y viajan en el
+  mismo mensaje que los cambios pendientes. Un aviso queda pendiente hasta
+  que Telegram acepta el mensaje (si falla se reintenta en el flush
+  siguiente) y recién ahí se llama a su `on_sent`.
+
+flush() se llama en cada tick del scheduler (también fuera de horario), así
+que lo acumulado al cierre sale en el tick siguiente.
+"""
+
+import threading
+
+from config.constants import (
+    CHAT_ID,
+    MIN_CHANGE_THRESHOLD,
+    ALERT_WINDOW_SECONDS,
+    ALERT_MIN_INTERVAL_SECONDS,
+    ALERT_HYSTERESIS_PCT,
+)
+from models.changes import Change
+from utils.formatters import format_change
+from utils.metrics import ALERTS_TOTAL
+from utils.telegram_helpers import safe_send_message
+
+ALERT_HEADER = "🚨 **Actualización Dólar** 🚨"
+
+
+class _ChatState:
+    """Estado de alertas de un chat: cambios y avisos pendientes, y lo último enviado."""
+    __slots__ = ("pending", "notices", "alerted", "last_sent")
+
+    def __init__(self):
+        self.pending = {}   # tipo -> (Change compra, Change venta) más reciente
+        self.notices = []   # (texto, on_sent) de los avisos de apertura/cierre pendientes
+        self.alerted = {}   # (tipo, lado) -> último valor informado al chat
+        self.last_sent = None # epoch del último mensaje enviado
+
+
+class AlertCoalescer:
+    """Acumula cambios y avisos por chat y decide cuándo mandar el resumen."""
+
+    def __init__(self, window=ALERT_WINDOW_SECONDS, min_interval=ALERT_MIN_INTERVAL_SECONDS,
+                 hysteresis_pct=ALERT_HYSTERESIS_PCT, threshold=MIN_CHANGE_THRESHOLD):
+        self.window = window
+        self.min_interval = min_interval
+        self.hysteresis_pct = hysteresis_pct
+        self.threshold = threshold
+        self._chats = {}
+        self._lock = threading.Lock()
+
+    def _chat(self, chat_id):
+        state = self._chats.get(chat_id)
+        if state is None:
+            state = self._chats[chat_id] = _ChatState()
+        return state
+
+    # ---------------- Entrada ----------------
+    def add(self, changes, chat_id=CHAT_ID):
+        """Registra los tipos que cambiaron en el ChangeSet de un tick."""
+        changed = changes.changed(self.threshold)
+        if not changed:
+            return
+        with self._lock:
+            state = self._chat(chat_id)
+            for name in changed:
+                pair = changes.get(name)
+                for change in pair:
+                    # Base de la histéresis: lo último alertado o, la primera vez, el valor previo al cambio
+                    state.alerted.setdefault((name, change.side), change.prev)
+                if name in state.pending:
+                    ALERTS_TOTAL.inc(outcome="coalesced")
+                state.pending[name] = pair
+
+    def notice(self, text, chat_id=CHAT_ID, on_sent=None):
+        """
+        Agrega un aviso (apertura/cierre) al próximo mensaje del chat.
+        `on_sent` se llama cuando el mensaje sale; un aviso ya pendiente no se repite.
+        """
+        with self._lock:
+            notices = self._chat(chat_id).notices
+            if all(pending != text for pending, _ in notices):
+                notices.append((text, on_sent))
+
+    # ---------------- Salida ----------------
+    def _due(self, state, now):
+        since = now - state.last_sent if state.last_sent is not None else None
+        if since is not None and since < self.min_interval:
+            return False
+        if state.notices:
+            return True
+        return bool(state.pending) and (since is None or since >= self.window)
+
+    def _digest(self, state):
+        """
+        (texto del resumen, avisos incluidos); descarta los tipos que no
+        superan la histéresis.
+        """
+        blocks = []
+        for name, pair in state.pending.items():
+            # Variación contra lo último alertado, no contra el tick anterior
+            merged = [Change(name, c.side, c.value, state.alerted.get((name, c.side))) for c in pair]
+            if not any(abs(c.pct) >= self.hysteresis_pct and abs(c.diff) >= self.threshold for c in merged):
+                ALERTS_TOTAL.inc(outcome="suppressed")
+                continue
+            for c in merged:
+                state.alerted[(name, c.side)] = c.value
+            blocks.append(format_change(name, *merged))
+        state.pending.clear()
+
+        notices = list(state.notices)
+        state.notices.clear()
+        parts = [text for text, _ in notices]
+        if blocks:
+            parts.append(ALERT_HEADER + "\n\n" + "\n\n".join(blocks))
+        return "\n\n".join(parts), notices
+
+    def flush(self, now):
+        """
+        Envía los resúmenes que correspondan a `now` (epoch). Devuelve la
+        cantidad de mensajes enviados.
+        """
+        outbox = []
+        with self._lock:
+            for chat_id, state in self._chats.items():
+                if not self._due(state, now):
+                    continue
+                message, notices = self._digest(state)
+                if message:
+                    state.last_sent = now
+                    outbox.append((chat_id, message, notices))
+
+        # El envío va fuera del lock: no frena al tick siguiente si Telegram tarda
+        sent = 0
+        for chat_id, message, notices in outbox:
+            if not safe_send_message(message, chat_id):
+                ALERTS_TOTAL.inc(outcome="failed")
+                # Los avisos vuelven a la cola (adelante) para el próximo flush
+                with self._lock:
+                    state = self._chat(chat_id)
+                    state.notices[:0] = [n for n in notices if all(n[0] != text for text, _ in state.notices)]
+                continue
+            ALERTS_TOTAL.inc(outcome="sent")
+            sent += 1
+            for _, on_sent in notices:
+                if on_sent is not None:
+                    on_sent()
+        return sent
+
+
+# Instancia usada por el scheduler
+coalescer = AlertCoalescer()
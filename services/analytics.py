@@ -0,0 +1,183 @@
+# services/analytics.py
+"""
+Métricas derivadas del historial, calculadas con NumPy sobre todos los tipos
+a la vez:
+
+- brecha: venta de cada tipo contra la del oficial (%).
+- spread: venta - compra de cada tipo (en pesos y %).
+- media móvil y volatilidad (desvío de las variaciones tick a tick, %) sobre
+  las últimas ANALYTICS_WINDOW cotizaciones.
+- variación desde la apertura de la jornada (%).
+
+El historial reciente del CSV se arma como una matriz ticks x tipos (con el
+snapshot actual como última fila) y cada métrica es una operación sobre esa
+matriz. El resultado se cachea por versión de snapshot y de historial, así
+que la web, la API y el bot comparten un único cálculo por tick.
+"""
+
+import threading
+import warnings
+from datetime import datetime
+
+from config.constants import DOLAR_TYPES, ANALYTICS_TICKS, ANALYTICS_WINDOW
+from models.snapshot import ARGENTINA_TZ
+from storage.csv_history import history_version, recent_rows
+
+BRECHA_TYPES = ("blue", "mep", "ccl") # los que se destacan en el mensaje del bot
+
+_cache_lock = threading.Lock()
+_cache = (None, None) # (clave, resultado)
+
+# ---------------- Cálculo ----------------
+def _matrices(rows, snapshot):
+    """
+    Matrices (tiempos, compra, venta) de ticks x DOLAR_TYPES. Las filas se
+    agrupan por minuto (los CSV viejos tienen un timestamp distinto por tipo)
+    y los huecos se completan con el último valor conocido.
+    """
+    import numpy as np # diferido: no pesa en el arranque
+
+    index = {name: i for i, name in enumerate(DOLAR_TYPES)}
+    if snapshot is not None:
+        ts = snapshot.timestamp.timestamp()
+        rows = rows + [(ts, name, q.compra, q.venta) for name, q in snapshot.items()]
+    if not rows:
+        return None
+
+    n = len(rows)
+    x = np.fromiter((r[0] for r in rows), float, n)
+    col = np.fromiter((index[r[1]] for r in rows), np.intp, n)
+    compra = np.fromiter((r[2] for r in rows), float, n)
+    venta = np.fromiter((r[3] for r in rows), float, n)
+
+    times, tick = np.unique(np.floor(x / 60) * 60, return_inverse=True)
+    shape = (len(times), len(DOLAR_TYPES))
+    compra_m = np.full(shape, np.nan)
+    venta_m = np.full(shape, np.nan)
+    # Las filas están en orden de llegada: ante duplicados queda la última
+    compra_m[tick, col] = compra
+    venta_m[tick, col] = venta
+    return times, _ffill(compra_m), _ffill(venta_m)
+
+def _ffill(m):
+    """Completa cada NaN con el último valor no-NaN de su columna (vectorizado)."""
+    import numpy as np
+
+    idx = np.where(np.isnan(m), 0, np.arange(m.shape[0])[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return m[idx, np.arange(m.shape[1])]
+
+def compute_analytics(rows, snapshot=None, window=ANALYTICS_WINDOW):
+    """
+    Calcula las métricas a partir de filas (epoch, tipo, compra, venta) y el
+    snapshot actual. Devuelve {"updated_at", "ticks", "window", "types": {tipo: {...}}}
+    con None donde no hay datos suficientes.
+    """
+    import numpy as np
+
+    built = _matrices(rows, snapshot)
+    if built is None:
+        return {"updated_at": None, "ticks": 0, "window": window, "types": {}}
+    times, compra, venta = built
+
+    last_c, last_v = compra[-1], venta[-1]
+    oficial = last_v[DOLAR_TYPES.index("oficial")]
+
+    # Tipos sin datos quedan en NaN; nanmean/nanstd avisan con RuntimeWarning
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        brecha = (last_v / oficial - 1) * 100
+        spread = last_v - last_c
+        spread_pct = spread / last_c * 100
+
+        sma = np.nanmean(venta[-window:], axis=0)
+        # Volatilidad: desvío de las variaciones tick a tick (%) dentro de la ventana
+        tail = venta[-(window + 1):]
+        returns = np.diff(tail, axis=0) / tail[:-1] * 100
+        volatility = np.nanstd(returns, axis=0) if len(returns) else np.full(len(DOLAR_TYPES), np.nan)
+
+        # Apertura: primera fila de la jornada de la última cotización
+        day_start = datetime.fromtimestamp(times[-1], ARGENTINA_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+        open_row = venta[np.searchsorted(times, day_start.timestamp())]
+        pct_from_open = (last_v / open_row - 1) * 100
+
+    def value(arr, i):
+        v = float(arr[i])
+        return None if np.isnan(v) or np.isinf(v) else round(v, 2)
+
+    types = {}
+    for i, name in enumerate(DOLAR_TYPES):
+        if np.isnan(last_v[i]):
+            continue
+        types[name] = {
+            "compra": value(last_c, i),
+            "venta": value(last_v, i),
+            "brecha": None if name == "oficial" else value(brecha, i),
+            "spread": value(spread, i),
+            "spread_pct": value(spread_pct, i),
+            "sma": value(sma, i),
+            "volatility": value(volatility, i),
+            "pct_from_open": value(pct_from_open, i),
+        }
+
+    updated = datetime.fromtimestamp(times[-1], ARGENTINA_TZ)
+    return {
+        "updated_at": updated.isoformat(),
+        "ticks": int(len(times)),
+        "window": window,
+        "types": types,
+    }
+
+# ---------------- Caché ----------------
+def get_analytics(snapshot=None):
+    """
+    Métricas vigentes, recalculadas solo cuando cambia el snapshot o el
+    historial. `snapshot` es el Snapshot actual (de get_current_snapshot()).
+    """
+    global _cache
+    key = (snapshot.version if snapshot is not None else None, history_version())
+    cached_key, cached = _cache
+    if cached is not None and cached_key == key:
+        return cached
+
+    with _cache_lock:
+        cached_key, cached = _cache
+        if cached is not None and cached_key == key:
+            return cached
+        result = compute_analytics(recent_rows(ANALYTICS_TICKS), snapshot)
+        _cache = (key, result)
+        return result
+
+# ---------------- Formato ----------------
+def format_analytics_message(analytics, tipo=None):
+    """Mensaje de Telegram (/brecha) con brechas, spreads, media móvil, volatilidad y variación del día."""
+    types = analytics["types"]
+    if not types:
+        return "Todavía no hay historial para calcular brechas 📭"
+
+    lines = ["📐 <b>Brechas y spreads</b>"]
+    oficial = types.get("oficial")
+    if oficial:
+        lines.append(f"Oficial: ${oficial['venta']:.2f}")
+    for name in ([tipo] if tipo else BRECHA_TYPES):
+        data = types.get(name)
+        if not data or data["brecha"] is None:
+            continue
+        lines.append(f"Brecha {name.upper()}: {data['brecha']:+.2f}%")
+
+    lines.append("")
+    for name in ([tipo] if tipo else DOLAR_TYPES):
+        data = types.get(name)
+        if not data:
+            continue
+        parts = [f"<b>{name.title()}</b>: spread ${data['spread']:.2f}" if data["spread"] is not None else f"<b>{name.title()}</b>:"]
+        if data["pct_from_open"] is not None:
+            parts.append(f"apertura {data['pct_from_open']:+.2f}%")
+        if data["sma"] is not None:
+            parts.append(f"media ${data['sma']:.2f}")
+        if data["volatility"] is not None:
+            parts.append(f"vol {data['volatility']:.2f}%")
+        lines.append(" · ".join(parts))
+
+    lines.append(f"\n<i>Media y volatilidad de las últimas {analytics['window']} cotizaciones.</i>")
+    return "\n".join(lines)
@@ -0,0 +1,167 @@
+# services/chart_service.py
+"""
+Gráficos y resúmenes para los comandos /grafico y /resumen del bot.
+
+Cada imagen se renderiza una vez por (comando, tipo, rango, versión de datos)
+y después de la primera subida se reenvía con el file_id que devuelve
+Telegram: mandar el mismo gráfico a miles de usuarios cuesta un render y un
+upload. La versión de datos cambia cuando un tick agrega filas al historial.
+"""
+
+import threading
+from array import array
+from datetime import datetime, timedelta
+
+from config.constants import DOLAR_TYPES
+from models.snapshot import ARGENTINA_TZ
+from storage.csv_history import history_version, recent_series, series_since
+from storage.retention import read_history
+from utils.charts import line_chart_png
+from utils.formatters import emoji, pct_str
+from utils.helpers import now_argentina, parse_timestamp
+from utils.metrics import CHART_CACHE_TOTAL, CHART_SEND_TOTAL
+from utils.telegram_client import send_telegram_photo, photo_file_id
+
+# Rangos de /grafico. "dia" es la última jornada con datos (hoy, o la anterior
+# si hoy todavía no hubo ticks); el resto cuenta hacia atrás desde ahora.
+RANGOS = {"dia": None, "semana": timedelta(days=7), "mes": timedelta(days=30)}
+RANGO_ALIASES = {"hoy": "dia", "día": "dia", "1d": "dia", "7d": "semana", "30d": "mes"}
+RANGO_TITLES = {"semana": "últimos 7 días", "mes": "últimos 30 días"}
+
+def parse_rango(text: str) -> str:
+    """Busca un rango en el texto del comando ('/grafico blue semana' -> 'semana'); por defecto 'dia'."""
+    for word in text.split()[1:]:
+        rango = RANGO_ALIASES.get(word, word)
+        if rango in RANGOS:
+            return rango
+    return "dia"
+
+class _Entry:
+    """Imagen renderizada para una clave y versión de datos, con su file_id una vez subida."""
+    __slots__ = ("version", "png", "caption", "file_id", "lock")
+
+    def __init__(self, version):
+        self.version = version
+        self.png = None
+        self.caption = None
+        self.file_id = None
+        # Serializa render y primera subida: los pedidos simultáneos esperan el file_id
+        self.lock = threading.Lock()
+
+_entries = {} # (comando, tipo, rango) -> _Entry de la versión vigente
+_entries_lock = threading.Lock()
+
+# ---------------- Datos ----------------
+def _day_start(series):
+    """Medianoche del día del último tick del historial."""
+    last = max((xs[-1] for xs, _ in series.values() if xs), default=None)
+    if last is None:
+        return None
+    return datetime.fromtimestamp(last, ARGENTINA_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _load_series(tipo, rango, now):
+    """{tipo: (xs, ys)} para el rango pedido."""
+    names = [tipo] if tipo else DOLAR_TYPES
+    if rango == "dia":
+        start = _day_start(recent_series(1))
+        series = series_since(start) if start else {}
+    elif rango == "mes":
+        # Más allá de la retención del CSV: rollups por hora (nivel caliente + archivo)
+        start = now - RANGOS[rango]
+        series = {}
+        for name in names:
+            records = read_history(name, start, resolution="hour")
+            if records:
+                series[name] = (
+                    array("d", (parse_timestamp(r["timestamp"]).timestamp() for r in records)),
+                    array("d", (r["venta"] for r in records)),
+                )
+    else:
+        series = series_since(now - RANGOS[rango])
+    return {name: series[name] for name in names if name in series and len(series[name][1])}
+
+def _title(tipo, rango, series):
+    name = f"Dólar {tipo.title()}" if tipo else "Dólar"
+    if rango == "dia":
+        day = datetime.fromtimestamp(max(xs[-1] for xs, _ in series.values()), ARGENTINA_TZ)
+        return f"{name} - {day.strftime('%d/%m')}"
+    return f"{name} - {RANGO_TITLES[rango]}"
+
+def _summary_line(name, ys):
+    apertura, actual = ys[0], ys[-1]
+    diff = actual - apertura
+    return (
+        f"<b>{name.title()}</b>: ${actual:.2f} {emoji(diff)} {diff:+.2f} ({pct_str(diff, apertura)}) · "
+        f"mín ${min(ys):.2f} · máx ${max(ys):.2f}"
+    )
+
+# ---------------- Caché ----------------
+def _get_entry(command, tipo, rango):
+    """
+    Entrada vigente para (command, tipo, rango), renderizada si hace falta.
+    Devuelve None si no hay historial para ese rango.
+    """
+    now = now_argentina()
+    # La fecha entra en la versión para que los rangos móviles avancen aunque no haya ticks
+    version = (history_version(), now.date())
+    key = (command, tipo, rango)
+    with _entries_lock:
+        entry = _entries.get(key)
+        if entry is None or entry.version != version:
+            entry = _entries[key] = _Entry(version)
+
+    with entry.lock:
+        if entry.png is None:
+            series = _load_series(tipo, rango, now)
+            if not series:
+                entry.png = b""
+            else:
+                title = _title(tipo, rango, series)
+                entry.png = line_chart_png(series, title=title)
+                if command == "resumen":
+                    lines = [_summary_line(name, ys) for name, (_, ys) in series.items()]
+                    entry.caption = f"📊 <b>Resumen</b> - {title}\n\n" + "\n".join(lines)
+                elif tipo:
+                    entry.caption = f"📈 {title}\n" + _summary_line(tipo, series[tipo][1])
+                else:
+                    entry.caption = f"📈 {title}"
+            CHART_CACHE_TOTAL.inc(result="render")
+        else:
+            CHART_CACHE_TOTAL.inc(result="hit")
+    return entry if entry.png else None
+
+def _send(chat_id, entry):
+    """Envía la imagen por file_id si ya se subió; si no (o si el file_id falla), la sube."""
+    file_id = entry.file_id
+    if file_id:
+        result = send_telegram_photo(chat_id, file_id, entry.caption)
+        if result.get("ok"):
+            CHART_SEND_TOTAL.inc(via="file_id")
+            return result
+        entry.file_id = None
+
+    with entry.lock:
+        if entry.file_id and entry.file_id != file_id: # otro pedido la subió mientras esperábamos
+            CHART_SEND_TOTAL.inc(via="file_id")
+            return send_telegram_photo(chat_id, entry.file_id, entry.caption)
+        result = send_telegram_photo(chat_id, entry.png, entry.caption)
+        entry.file_id = photo_file_id(result)
+        CHART_SEND_TOTAL.inc(via="upload")
+        return result
+
+# ---------------- Comandos ----------------
+def send_chart(chat_id, tipo=None, rango="dia"):
+    """/grafico [tipo] [rango]. Devuelve False si no hay historial para ese rango."""
+    entry = _get_entry("grafico", tipo, rango)
+    if entry is None:
+        return False
+    _send(chat_id, entry)
+    return True
+
+def send_summary(chat_id):
+    """/resumen: gráfico de la última jornada con apertura, actual, mínimo y máximo de cada tipo."""
+    entry = _get_entry("resumen", None, "dia")
+    if entry is None:
+        return False
+    _send(chat_id, entry)
+    return True
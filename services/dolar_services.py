@@ -1,35 +1,147 @@
-import requests
+import threading
 from datetime import datetime
-from zoneinfo import ZoneInfo
-from utils.formatters import emoji # Importamos la función emoji ya refactorizada
+from utils.formatters import format_change
+from models.snapshot import Snapshot
+from models.changes import diff_snapshots
+from config.constants import DOLAR_TYPES, DOLAR_API_URL, SNAPSHOT_MAX_AGE_SECONDS
+from storage.snapshot_store import load_shared_snapshot, publish_snapshot
+from utils.file_helpers import log_error
+from utils.metrics import UPSTREAM_FETCH_SECONDS, UPSTREAM_FETCH_TOTAL, UPSTREAM_ERROR_RATE, SNAPSHOT_CACHE_TOTAL, FORMAT_MESSAGE_SECONDS
 
 # ---------------- Configuración ----------------
-DOLAR_API = "https://dolarapi.com/v1/dolares"
+DOLAR_API = DOLAR_API_URL
 
-DOLAR_TYPES = ["oficial", "blue", "mep", "ccl", "tarjeta", "cripto", "mayorista"]
-
-# ---------------- Funciones de cálculo (Se mantienen) ----------------
-def compute_diff(data, last):
-    """Calcula la diferencia absoluta y porcentual entre cotizaciones."""
-    
-    # Manejo de casos donde no hay cotización previa
-    last_compra = last.get("compra", data["compra"]) # Si no hay última, se usa la actual para diff 0
-    last_venta = last.get("venta", data["venta"])
-    
-    diff_compra = data["compra"] - last_compra
-    diff_venta = data["venta"] - last_venta
-    
-    # Evita la división por cero si la última cotización es 0
-    pct_compra = round((diff_compra / last_compra) * 100, 2) if last_compra else 0
-    pct_venta = round((diff_venta / last_venta) * 100, 2) if last_venta else 0
-    
-    return diff_compra, diff_venta, pct_compra, pct_venta
+# Arranque en frío: hasta que este proceso obtiene una cotización fresca se
+# sirve el último snapshot persistido y la consulta a la API va en segundo plano.
+_warm = threading.Event()
+_refresh_lock = threading.Lock()
 
 # ---------------- Función principal para traer cotizaciones ----------------
+def _map_nombre(nombre):
+    """Mapea el nombre que devuelve la API a nuestros tipos."""
+    if "oficial" in nombre: return "oficial"
+    if "blue" in nombre: return "blue"
+    if "bolsa" in nombre or "mep" in nombre: return "mep"
+    if "contado con liqui" in nombre or "ccl" in nombre: return "ccl"
+    if "tarjeta" in nombre: return "tarjeta"
+    if "cripto" in nombre: return "cripto"
+    if "mayorista" in nombre: return "mayorista"
+    return None
+
+def fetch_snapshot():
+    """
+    Obtiene las cotizaciones de la API externa y devuelve un Snapshot inmutable
+    con los siete tipos. Lanza la excepción original si la API falla, para que
+    cada llamador decida cómo reportarla.
+    """
+    import requests # diferido: no pesa en el arranque
+
+    # Petición a la API
+    try:
+        with UPSTREAM_FETCH_SECONDS.time():
+            resp = requests.get(DOLAR_API, timeout=10)
+            resp.raise_for_status()
+            data = resp.json()
+    except Exception:
+        UPSTREAM_FETCH_TOTAL.inc(outcome="error")
+        UPSTREAM_ERROR_RATE.record(False)
+        raise
+    UPSTREAM_FETCH_TOTAL.inc(outcome="ok")
+    UPSTREAM_ERROR_RATE.record(True)
+    _warm.set()
+    rates, last_update = {}, None
+
+    # Parseo de la API
+    for item in data:
+        tipo = _map_nombre(item["nombre"].lower())
+        compra, venta = item.get("compra"), item.get("venta")
+        
+        if tipo is None or compra is None or venta is None:
+            continue
+        
+        fecha = item.get("fechaActualizacion")
+        
+        # Determina la última fecha de actualización de todas las cotizaciones
+        if fecha:
+            dt = datetime.fromisoformat(fecha.replace("Z", "+00:00"))
+            if not last_update or dt > last_update:
+                last_update = dt
+
+        rates[tipo] = {"compra": compra, "venta": venta}
+
+    return Snapshot.from_rates(rates, source_time=last_update)
+
+def _is_fresh(snapshot):
+    if snapshot is None:
+        return False
+    age = (datetime.now(snapshot.timestamp.tzinfo) - snapshot.timestamp).total_seconds()
+    return 0 <= age < SNAPSHOT_MAX_AGE_SECONDS
+
+def get_current_snapshot():
+    """
+    Devuelve el snapshot compartido si tiene menos de SNAPSHOT_MAX_AGE_SECONDS
+    (dos intervalos, para no consultar la API mientras el líder está en medio
+    de un tick). Si no hay ninguno o está viejo (ej. fuera del horario de
+    mercado), consulta la API y publica el resultado en el archivo
+    compartido: el resto de los requests y workers lo reutilizan hasta que
+    vuelva a vencer. La consulta es de a una por proceso; los requests que
+    llegan mientras tanto esperan y usan el mismo snapshot.
+
+    Justo después de arrancar (proceso recién despertado) no espera a la API:
+    devuelve el snapshot persistido aunque esté viejo y lo actualiza en
+    segundo plano. Si la consulta falla también se devuelve el persistido;
+    solo se propaga el error cuando no hay ninguno.
+
+    Es bloqueante: desde handlers async llamarla con run_in_threadpool.
+    Retorna una tupla (snapshot, fresh_fetch).
+    """
+    snapshot = load_shared_snapshot()
+    if _is_fresh(snapshot):
+        SNAPSHOT_CACHE_TOTAL.inc(result="hit")
+        _warm.set()
+        return snapshot, False
+    if snapshot is not None and not _warm.is_set():
+        SNAPSHOT_CACHE_TOTAL.inc(result="stale")
+        _refresh_in_background()
+        return snapshot, False
+
+    with _refresh_lock:
+        # Otro request (o el líder) pudo haberlo publicado mientras esperábamos el lock
+        snapshot = load_shared_snapshot()
+        if _is_fresh(snapshot):
+            SNAPSHOT_CACHE_TOTAL.inc(result="hit")
+            return snapshot, False
+        SNAPSHOT_CACHE_TOTAL.inc(result="miss")
+        try:
+            fresh = fetch_snapshot()
+        except Exception as e:
+            # Con la API caída se sirve el último snapshot persistido aunque esté viejo
+            if snapshot is None:
+                raise
+            log_error(f"Error obteniendo cotizaciones de la API, se usa el último snapshot: {e}")
+            SNAPSHOT_CACHE_TOTAL.inc(result="stale")
+            return snapshot, False
+        publish_snapshot(fresh)
+        return fresh, True
+
+def _refresh_in_background():
+    """Trae y publica un snapshot nuevo en un thread aparte (uno a la vez por proceso)."""
+    if not _refresh_lock.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            publish_snapshot(fetch_snapshot())
+        except Exception as e:
+            log_error(f"Error actualizando el snapshot en segundo plano: {e}")
+        finally:
+            _refresh_lock.release()
+
+    threading.Thread(target=run, name="snapshot-refresh", daemon=True).start()
+
 def fetch_dolar_rates():
     """
-    Obtiene las cotizaciones de la API externa, las parsea y calcula
-    la fecha de actualización.
+    Versión legada de fetch_snapshot() que devuelve dicts.
     
     Retorna:
     {
@@ -38,63 +150,29 @@ def fetch_dolar_rates():
     }
     """
     try:
-        # Petición a la API
-        resp = requests.get(DOLAR_API, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        rates, last_update = {}, None
-
-        # Parseo de la API
-        for item in data:
-            nombre = item["nombre"].lower()
-            compra, venta = item.get("compra"), item.get("venta")
-            
-            if compra is None or venta is None:
-                continue
-            
-            promedio = (compra + venta) / 2
-            fecha = item.get("fechaActualizacion")
-            
-            # Determina la última fecha de actualización de todas las cotizaciones
-            if fecha:
-                dt = datetime.fromisoformat(fecha.replace("Z", "+00:00"))
-                if not last_update or dt > last_update:
-                    last_update = dt
-
-            # Mapear nombres a tus tipos
-            rate_data = {"compra": compra, "venta": venta, "promedio": promedio}
-            if "oficial" in nombre: rates["oficial"] = rate_data
-            elif "blue" in nombre: rates["blue"] = rate_data
-            elif "bolsa" in nombre or "mep" in nombre: rates["mep"] = rate_data
-            elif "contado con liqui" in nombre or "ccl" in nombre: rates["ccl"] = rate_data
-            elif "tarjeta" in nombre: rates["tarjeta"] = rate_data
-            elif "cripto" in nombre: rates["cripto"] = rate_data
-            elif "mayorista" in nombre: rates["mayorista"] = rate_data
-            # NOTA: La lógica de guardar diferencias y rates YA NO VA AQUÍ.
-
-        # Convertir fecha a hora Argentina para el reporte
-        argentina_tz = ZoneInfo("America/Argentina/Buenos_Aires")
-        fecha_str = last_update.astimezone(argentina_tz).strftime("%d/%m/%Y %H:%M") if last_update else "desconocida"
-
-        return {"rates": rates, "updated_at": fecha_str}
-
+        return fetch_snapshot().to_result()
     except Exception as e:
-        # Usamos la función de logging o simplemente retornamos el error
-        from utils.file_helpers import log_error # Importación local para evitar dependencia circular
         log_error(f"Error obteniendo cotizaciones de la API: {e}")
         return {"error": f"No se pudo obtener la cotización ({e})", "rates": {}}
 
 # ---------------- Formateo de mensajes (Se mantiene pero simplificado) ----------------
-def format_message(result, last_rates, tipo=None):
+@FORMAT_MESSAGE_SECONDS.time()
+def format_message(result, last_rates=None, tipo=None, changes=None):
     """
     Formatea las cotizaciones para un mensaje de Telegram.
+    `result` puede ser un Snapshot o el dict legado de fetch_dolar_rates();
+    `last_rates` puede ser un Snapshot o un dict de rates. Si se pasa `changes`
+    (el ChangeSet publicado por el líder) se usa tal cual y `last_rates` se ignora.
     NOTA: Las funciones de formato más complejas deben idealmente ir en un módulo 'formatters'.
     """
-    if "error" in result:
-        return result["error"]
-
-    rates = result.get("rates", {})
-    updated_at = result.get("updated_at", "fecha desconocida")
+    if isinstance(result, dict):
+        if "error" in result:
+            return result["error"]
+        snapshot = Snapshot.from_rates(result.get("rates", {}))
+        updated_at = result.get("updated_at", "fecha desconocida")
+    else:
+        snapshot = result
+        updated_at = snapshot.updated_at
 
     emojis_dict = {
         "oficial":"🏦",
@@ -106,20 +184,16 @@ def format_message(result, last_rates, tipo=None):
         "mayorista":"🏛️"
     }
 
+    # Variaciones contra las últimas cotizaciones informadas (motor de cambios)
+    if changes is None:
+        changes = diff_snapshots(snapshot, Snapshot.coerce(last_rates) if last_rates else None)
+
     def format_rate(name):
-        data = rates.get(name, {"compra": 0, "venta": 0})
-        last = last_rates.get(name, {"compra": 0, "venta": 0})
-        
-        # Usa la función compute_diff de este mismo módulo
-        diff_compra, diff_venta, pct_compra, pct_venta = compute_diff(data, last)
-        
         e = emojis_dict.get(name, "💰")
-        
-        return (
-            f"{e} *{name.capitalize()}*\n"
-            f"   Compra: {emoji(diff_compra)} ${data['compra']:.2f} ({diff_compra:+.2f}, {pct_compra:+.2f}%)\n"
-            f"   Venta:  {emoji(diff_venta)} ${data['venta']:.2f} ({diff_venta:+.2f}, {pct_venta:+.2f}%)"
-        )
+        pair = changes.get(name)
+        if pair is None:
+            return f"{e} *{name.capitalize()}*\n   Sin cotización"
+        return format_change(name, *pair, title=f"{e} *{name.capitalize()}*")
 
     if tipo:
         tipo = tipo.lower()
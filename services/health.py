@@ -0,0 +1,107 @@
+# services/health.py
+"""
+Readiness del worker para GET /ready.
+
+Todo se calcula con estado en memoria (scheduler, último tick, snapshot
+cacheado, métricas y cola de logs): no lee archivos ni consulta la API, así
+que se puede consultar cada pocos segundos sin costo.
+"""
+
+import time
+
+from config.constants import (
+    CHECK_INTERVAL_MINUTES,
+    HEALTH_MAX_SNAPSHOT_AGE_SECONDS,
+    HEALTH_MAX_UPSTREAM_ERROR_RATE,
+    HEALTH_MAX_LOG_BACKLOG,
+)
+from scheduler import tasks
+from scheduler.leader import is_leader
+from scheduler.main_scheduler import scheduler
+from storage.snapshot_store import cached_snapshot
+from utils.helpers import now_argentina
+from utils.logger import log_backlog
+from utils.metrics import SCHEDULER_JOBS_TOTAL, UPSTREAM_ERROR_RATE
+
+MARKET_OPEN_HOUR = 10
+MARKET_CLOSE_HOUR = 17
+
+def _age(ts):
+    return round(time.time() - ts, 1) if ts else None
+
+def _scheduler_alive():
+    thread = getattr(scheduler, "_thread", None)
+    return scheduler.running and thread is not None and thread.is_alive()
+
+def _expects_fresh_snapshot(now):
+    """
+    True si a esta hora ya debería haber un snapshot reciente: dentro del
+    horario de mercado y pasado el margen desde la apertura (antes de eso el
+    último snapshot es legítimamente el del cierre anterior).
+    """
+    opened = now.replace(hour=MARKET_OPEN_HOUR, minute=0, second=0, microsecond=0)
+    return now.hour < MARKET_CLOSE_HOUR and (now - opened).total_seconds() >= HEALTH_MAX_SNAPSHOT_AGE_SECONDS
+
+def readiness():
+    """
+    Devuelve (ready, reporte). `reporte["checks"]` indica qué condición falló;
+    el resto son datos informativos para diagnosticar una instancia trabada.
+    """
+    now = now_argentina()
+    leader = is_leader()
+    snapshot = cached_snapshot()
+    snapshot_age = round((now - snapshot.timestamp).total_seconds(), 1) if snapshot else None
+    error_rate, fetches = UPSTREAM_ERROR_RATE.rate()
+    log_queue, log_dropped = log_backlog()
+    state = dict(tasks.tick_state)
+    tick_running = bool(state["started_at"]) and (state["finished_at"] or 0) < state["started_at"]
+
+    checks = {
+        "scheduler_running": _scheduler_alive(),
+        "upstream_ok": error_rate <= HEALTH_MAX_UPSTREAM_ERROR_RATE,
+        "log_backlog_ok": log_queue <= HEALTH_MAX_LOG_BACKLOG,
+    }
+    if leader:
+        # El tick corre siempre (fuera de horario sale enseguida): si no arrancó
+        # hace rato, el job dejó de correr o quedó colgado en el anterior.
+        tick_age = _age(state["started_at"])
+        checks["tick_recent"] = tick_age is not None and tick_age <= HEALTH_MAX_SNAPSHOT_AGE_SECONDS
+        if _expects_fresh_snapshot(now):
+            checks["snapshot_fresh"] = snapshot_age is not None and snapshot_age <= HEALTH_MAX_SNAPSHOT_AGE_SECONDS
+
+    report = {
+        "status": "ok" if all(checks.values()) else "degraded",
+        "role": "leader" if leader else "follower",
+        "checks": checks,
+        "snapshot": {
+            "age_seconds": snapshot_age,
+            "version": snapshot.version if snapshot else None,
+            "max_age_seconds": HEALTH_MAX_SNAPSHOT_AGE_SECONDS,
+        },
+        "scheduler": {
+            "jobs": len(scheduler.get_jobs()) if scheduler.running else 0,
+            "missed_jobs": SCHEDULER_JOBS_TOTAL.total(outcome="missed"),
+            "failed_jobs": SCHEDULER_JOBS_TOTAL.total(outcome="error"),
+            "interval_seconds": CHECK_INTERVAL_MINUTES * 60,
+        },
+        "tick": {
+            "running": tick_running,
+            "last_started_ago": _age(state["started_at"]),
+            "last_duration_seconds": round(state["duration"], 3) if state["duration"] is not None else None,
+            "last_success_ago": _age(state["last_success"]),
+            "last_error": state["last_error"],
+        },
+        "upstream": {
+            "error_rate": round(error_rate, 3),
+            "window": fetches,
+            "max_error_rate": HEALTH_MAX_UPSTREAM_ERROR_RATE,
+        },
+        "storage": {
+            # Las escrituras de historial son sincrónicas dentro del tick: su
+            # backlog es un tick en curso. El único writer diferido es el de logs.
+            "tick_in_progress": tick_running,
+            "log_queue": log_queue,
+            "log_dropped": log_dropped,
+        },
+    }
+    return all(checks.values()), report
@@ -1,41 +1,44 @@
-from utils.telegram_client import send_telegram_message
-from services.dolar_services import fetch_dolar_rates, load_last_rates, save_last_rates
-from datetime import datetime
-import os
+# services/notifier.py
+"""
+Notificación puntual de cambios (para correr a mano o desde un cron externo):
+compara la cotización actual contra las últimas guardadas en DATA_FILE con el
+mismo motor de cambios que usa el scheduler.
+"""
 
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+from models.changes import diff_snapshots
+from models.snapshot import Snapshot
+from services.dolar_services import fetch_snapshot
+from utils.file_helpers import load_json, save_json, log_error
+from utils.formatters import format_change
+from utils.helpers import now_argentina
+from utils.telegram_helpers import safe_send_message
+from config.constants import DATA_FILE, MIN_CHANGE_THRESHOLD
 
 def send_daily_notification():
-    current_hour = datetime.now().hour
+    current_hour = now_argentina().hour
     if not (10 <= current_hour < 17):
         print("⏰ Fuera del horario bancario.")
         return
 
-    current_data = fetch_dolar_rates()
-    if "error" in current_data:
+    try:
+        snapshot = fetch_snapshot()
+    except Exception as e:
+        log_error(f"Error obteniendo cotizaciones: {e}")
         print("❌ No se pudo obtener la cotización.")
         return
 
-    rates = current_data["rates"]
-    last_rates = load_last_rates()
-    changes = []
-
-    if last_rates:
-        for tipo, valor in rates.items():
-            if tipo in last_rates:
-                diff = round(valor - last_rates[tipo], 2)
-                if abs(diff) >= 2:
-                    arrow = "📈" if diff > 0 else "📉"
-                    changes.append(f"{arrow} Dólar {tipo}: cambio de ${diff} (ahora ${valor})")
-    else:
+    last_rates = load_json(DATA_FILE)
+    if not last_rates:
         print("Primera ejecución registrada.")
+    previous = Snapshot.coerce(last_rates) if last_rates else None
+    changes = diff_snapshots(snapshot, previous)
 
-    if changes:
-        message = "⚡ Actualización:\n" + "\n".join(changes)
-        message += f"\n\n🕒 {current_data['updated_at']}"
-        send_telegram_message(message)  # <-- aquí se manda a Telegram
+    messages = [format_change(name, *changes.get(name)) for name in changes.changed(MIN_CHANGE_THRESHOLD)]
+    if messages:
+        message = "⚡ Actualización:\n\n" + "\n\n".join(messages)
+        message += f"\n\n🕒 {snapshot.updated_at}"
+        safe_send_message(message)
         print("✅ Notificación enviada.")
 
-    save_last_rates(rates)
-    print("✅ Datos guardados.")
\ No newline at end of file
+    save_json(DATA_FILE, snapshot.fill_missing(previous).to_dict())
+    print("✅ Datos guardados.")
@@ -0,0 +1,348 @@
+# storage/backfill.py
+"""
+Importa el historial disperso (history.json, dolar_history.csv y la tabla
+`cotizaciones` de Supabase) a la base SQLite de storage/sqlite_history.py.
+
+Cada fuente se lee en streaming y se inserta por lotes, así que la memoria
+usada no depende del tamaño del historial. Después de cada lote se guarda un
+checkpoint: si el proceso se corta, volver a correrlo retoma desde ahí. Las
+filas repetidas (mismo tipo y timestamp) se descartan por el índice único,
+así que ante la duda (archivo reescrito por la retención, checkpoint de una
+versión anterior) se relee de más en lugar de saltear filas.
+
+Uso:
+    python -m storage.backfill                      # history.json + CSV
+    python -m storage.backfill --supabase           # incluye Supabase
+    python -m storage.backfill --json otro.json --csv otro.csv --db data/history.db
+    python -m storage.backfill --reset              # ignora los checkpoints previos
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+import requests
+
+from config.constants import (
+    HISTORY_JSON_FILE,
+    HISTORY_CSV_FILE,
+    SQLITE_DB_FILE,
+    BACKFILL_CHECKPOINT_FILE,
+    DOLAR_TYPES,
+)
+from storage.csv_history import normalize_row
+from storage.sqlite_history import insert_rows
+from utils.file_helpers import load_json, save_json, log_error
+from utils.helpers import parse_timestamp
+
+BATCH_SIZE = 5000
+JSON_CHUNK_SIZE = 64 * 1024
+SUPABASE_PAGE_SIZE = 1000
+
+_decoder = json.JSONDecoder()
+
+# ---------------- Lectura incremental de JSON ----------------
+class _JsonStream:
+    """Tokenizador mínimo que lee el archivo por bloques y decodifica valor por valor."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(JSON_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        # Descartamos lo ya consumido: el buffer solo guarda el valor en curso
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"JSON inválido: se esperaba '{char}' y se encontró '{self.peek()}'")
+        self.pos += 1
+
+    def skip_comma(self):
+        if self.peek() == ",":
+            self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Un número al final del buffer puede estar cortado: leemos más y reintentamos
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+def iter_json_history(path):
+    """
+    Recorre history.json sin cargarlo entero. Soporta el formato actual
+    {"blue": [registros...], ...} y una lista plana de registros con "tipo"/"dolar_name".
+    Genera tuplas (dolar_name, registro).
+    """
+    with open(path, "r") as f:
+        stream = _JsonStream(f)
+        first = stream.peek()
+        if first == "{":
+            stream.expect("{")
+            while stream.peek() != "}":
+                name = stream.value()
+                stream.expect(":")
+                stream.expect("[")
+                while stream.peek() != "]":
+                    yield name, stream.value()
+                    stream.skip_comma()
+                stream.expect("]")
+                stream.skip_comma()
+        elif first == "[":
+            stream.expect("[")
+            while stream.peek() != "]":
+                record = stream.value()
+                if isinstance(record, dict):
+                    yield record.get("dolar_name") or record.get("tipo"), record
+                stream.skip_comma()
+
+# ---------------- Lectura de CSV ----------------
+def _parse_csv_line(line):
+    return next(csv.reader([line.decode("utf-8")]), [])
+
+def _is_header(row):
+    return bool(row) and row[0] == "timestamp"
+
+def _header_before(f, offset):
+    """Último encabezado que aparece antes de `offset` (checkpoints viejos sin encabezado)."""
+    f.seek(0)
+    header, position = None, 0
+    for line in f:
+        if position >= offset:
+            break
+        position += len(line)
+        row = _parse_csv_line(line)
+        if _is_header(row):
+            header = row
+    return header
+
+def iter_csv_history(path, checkpoint=0):
+    """
+    Recorre dolar_history.csv línea por línea desde el checkpoint.
+    Reconoce los dos esquemas que conviven en el archivo:
+      - largo: timestamp, dolar_name, compra, venta[, diff_compra, diff_venta[, pct_compra, pct_venta]]
+      - ancho: timestamp, oficial, blue, ... (solo precio de venta; requiere encabezado)
+    El encabezado vigente puede estar a mitad de archivo, así que el checkpoint
+    guarda el offset en bytes, ese encabezado y el inodo del archivo:
+    {"offset": n, "header": [...], "inode": i} (un entero de versiones
+    anteriores se toma como offset y el encabezado se busca releyendo hasta ahí).
+    Si el archivo fue reescrito (la retención lo reemplaza con os.replace: otro
+    inodo) o es más corto que el offset, el offset ya no apunta a lo importado
+    y se empieza de nuevo desde el principio.
+    Genera tuplas (checkpoint_siguiente, filas) donde `filas` son los registros
+    normalizados de esa línea (puede ser una lista vacía si la línea no se pudo interpretar).
+    """
+    if isinstance(checkpoint, dict):
+        offset, header, inode = checkpoint.get("offset", 0), checkpoint.get("header"), checkpoint.get("inode")
+    else:
+        offset, header, inode = checkpoint or 0, None, None
+
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if offset and ((inode is not None and inode != stat.st_ino) or stat.st_size < offset):
+            print(f"♻️ {path} cambió desde el último checkpoint: se importa desde el principio")
+            offset, header = 0, None
+        inode = stat.st_ino
+        if offset and header is None:
+            header = _header_before(f, offset)
+        position = offset
+        f.seek(position)
+
+        for line in f:
+            position += len(line)
+            row = _parse_csv_line(line)
+            if _is_header(row):
+                header = row
+                row = []
+            try:
+                rows = normalize_row(row, header) if row else []
+            except ValueError:
+                rows = []
+            yield {"offset": position, "header": header, "inode": inode}, rows
+
+# ---------------- Lectura de Supabase ----------------
+def iter_supabase_history(offset=0):
+    """Pagina la tabla `cotizaciones` de Supabase ordenada por timestamp. Genera (offset_siguiente, filas)."""
+    from storage.supabase_client import SUPABASE_URL, SUPABASE_API_KEY, headers
+
+    if not SUPABASE_URL or not SUPABASE_API_KEY:
+        raise RuntimeError("Faltan SUPABASE_URL / SUPABASE_API_KEY")
+
+    url = f"{SUPABASE_URL}/rest/v1/cotizaciones"
+    while True:
+        params = {
+            "select": "dolar_name,timestamp,compra,venta,diff_compra,diff_venta,pct_compra,pct_venta",
+            "order": "timestamp.asc,dolar_name.asc",
+            "limit": SUPABASE_PAGE_SIZE,
+            "offset": offset,
+        }
+        resp = requests.get(url, params=params, headers=headers, timeout=30)
+        resp.raise_for_status()
+        rows = resp.json()
+        offset += len(rows)
+        yield offset, rows
+        if len(rows) < SUPABASE_PAGE_SIZE:
+            return
+
+# ---------------- Importador ----------------
+class Backfill:
+    """Agrupa filas en lotes, las inserta y guarda checkpoints con métricas de throughput."""
+
+    def __init__(self, db_path, checkpoint_file=BACKFILL_CHECKPOINT_FILE, batch_size=BATCH_SIZE, reset=False):
+        self.db_path = db_path
+        self.checkpoint_file = checkpoint_file
+        self.batch_size = batch_size
+        self.checkpoints = {} if reset else (load_json(checkpoint_file) or {})
+
+    def _report(self, source, read, inserted, skipped, started):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"📥 {source}: {read} filas leídas, {inserted} nuevas, {skipped} omitidas ({read / elapsed:,.0f} filas/s)")
+
+    def _flush(self, source, batch, position):
+        inserted = insert_rows(batch, db_path=self.db_path)
+        batch.clear()
+        self.checkpoints[source] = position
+        save_json(self.checkpoint_file, self.checkpoints)
+        return inserted
+
+    def _valid(self, record) -> bool:
+        try:
+            parse_timestamp(record["timestamp"])
+            return record.get("dolar_name") in DOLAR_TYPES and record.get("venta") is not None
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def run_json(self, path):
+        """
+        Importa history.json. El archivo se reescribe entero en cada tick y la
+        retención le saca los registros viejos, así que una posición no sirve
+        de checkpoint: se guarda el último timestamp importado de cada tipo
+        ({"last": {tipo: timestamp}}) y se saltean los registros hasta ese.
+        """
+        source = f"json:{os.path.abspath(path)}"
+        saved = self.checkpoints.get(source)
+        # Un checkpoint de versiones anteriores (índice global) se descarta: se relee todo
+        newest = {}
+        for name, ts in (saved.get("last", {}) if isinstance(saved, dict) else {}).items():
+            try:
+                newest[name] = (parse_timestamp(ts), ts)
+            except (TypeError, ValueError):
+                continue
+        done = {name: dt for name, (dt, _) in newest.items()}
+        read = inserted = skipped = 0
+        batch, started = [], time.perf_counter()
+
+        def position():
+            return {"last": {name: ts for name, (_, ts) in newest.items()}}
+
+        for name, record in iter_json_history(path):
+            row = {**record, "dolar_name": name} if isinstance(record, dict) else {}
+            if not self._valid(row):
+                read += 1
+                skipped += 1
+                continue
+            dt = parse_timestamp(row["timestamp"])
+            if name in done and dt <= done[name]:
+                continue
+            read += 1
+            batch.append(row)
+            if name not in newest or dt > newest[name][0]:
+                newest[name] = (dt, row["timestamp"])
+            if len(batch) >= self.batch_size:
+                inserted += self._flush(source, batch, position())
+                self._report(source, read, inserted, skipped, started)
+
+        inserted += self._flush(source, batch, position())
+        self._report(source, read, inserted, skipped, started)
+
+    def _run_paged(self, source, pages):
+        read = inserted = skipped = 0
+        position = self.checkpoints.get(source, 0)
+        batch, started = [], time.perf_counter()
+
+        for position, rows in pages:
+            for row in rows:
+                read += 1
+                if self._valid(row):
+                    batch.append(row)
+                else:
+                    skipped += 1
+            if len(batch) >= self.batch_size:
+                inserted += self._flush(source, batch, position)
+                self._report(source, read, inserted, skipped, started)
+
+        inserted += self._flush(source, batch, position)
+        self._report(source, read, inserted, skipped, started)
+
+    def run_csv(self, path):
+        """Importa dolar_history.csv. El checkpoint es el offset en bytes ya procesado, el encabezado vigente y el inodo."""
+        source = f"csv:{os.path.abspath(path)}"
+        self._run_paged(source, iter_csv_history(path, self.checkpoints.get(source, 0)))
+
+    def run_supabase(self):
+        """Importa la tabla de Supabase. El checkpoint es el offset de filas ya leídas."""
+        source = "supabase:cotizaciones"
+        self._run_paged(source, iter_supabase_history(self.checkpoints.get(source, 0)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa el historial de cotizaciones a SQLite.")
+    parser.add_argument("--json", dest="json_path", help=f"history.json a importar (por defecto {HISTORY_JSON_FILE})")
+    parser.add_argument("--csv", dest="csv_path", help=f"CSV a importar (por defecto {HISTORY_CSV_FILE})")
+    parser.add_argument("--supabase", action="store_true", help="Importar también la tabla cotizaciones de Supabase")
+    parser.add_argument("--db", default=str(SQLITE_DB_FILE), help="Base SQLite destino")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--reset", action="store_true", help="Ignorar checkpoints y releer todo")
+    args = parser.parse_args(argv)
+
+    # Sin fuentes explícitas se importan los archivos locales por defecto
+    json_path, csv_path = args.json_path, args.csv_path
+    if not json_path and not csv_path and not args.supabase:
+        json_path, csv_path = HISTORY_JSON_FILE, HISTORY_CSV_FILE
+
+    backfill = Backfill(args.db, batch_size=args.batch_size, reset=args.reset)
+    started = time.perf_counter()
+
+    for label, run, path in (("JSON", backfill.run_json, json_path), ("CSV", backfill.run_csv, csv_path)):
+        if path and os.path.exists(path):
+            run(path)
+        elif path:
+            print(f"⚠️ No existe el archivo {label}: {path}")
+
+    if args.supabase:
+        try:
+            backfill.run_supabase()
+        except Exception as e:
+            log_error(f"Error importando desde Supabase: {e}")
+
+    print(f"✅ Backfill terminado en {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,197 @@
 # storage/csv_history.py
 
+import csv
+import math
 import os
-import pandas as pd
-from config.constants import HISTORY_CSV_FILE
+import threading
+from array import array
+from config.constants import HISTORY_CSV_FILE, DOLAR_TYPES
 from utils.file_helpers import ensure_dirs, log_error
+from utils.helpers import parse_timestamp
+
+# Evita que el job de retención reescriba el CSV mientras se le agregan filas
+csv_lock = threading.Lock()
 
 def append_to_csv(csv_rows):
     """
-    Agrega filas de cotizaciones al archivo CSV histórico usando pandas.
+    Agrega filas de cotizaciones al archivo CSV histórico.
+    Usa el módulo csv en vez de pandas: mismo formato, sin cargar pandas al arrancar.
     """
     ensure_dirs(HISTORY_CSV_FILE)
     file_exists = os.path.isfile(HISTORY_CSV_FILE)
     
     if csv_rows:
         try:
-            df = pd.DataFrame(csv_rows)
-            df.to_csv(HISTORY_CSV_FILE, mode='a', header=not file_exists, index=False)
+            with csv_lock, open(HISTORY_CSV_FILE, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(csv_rows[0]), lineterminator="\n")
+                if not file_exists:
+                    writer.writeheader()
+                writer.writerows(csv_rows)
         except Exception as e:
-            log_error(f"Error escribiendo en CSV histórico: {e}")
\ No newline at end of file
+            log_error(f"Error escribiendo en CSV histórico: {e}")
+
+# ---------------- Normalización ----------------
+def normalize_row(row, header=None):
+    """
+    Fila del CSV -> lista de registros {"dolar_name", "timestamp", "compra", "venta", ...}.
+    Reconoce los dos esquemas que conviven en el archivo:
+      - largo: timestamp, dolar_name, compra, venta[, diff_compra, diff_venta[, pct_compra, pct_venta]]
+      - ancho: timestamp, oficial, blue, ... (solo precio de venta; requiere `header`)
+    Lanza ValueError si algún valor no es numérico.
+    """
+    timestamp = row[0]
+    if len(row) > 1 and row[1] in DOLAR_TYPES:
+        fields = ["compra", "venta", "diff_compra", "diff_venta", "pct_compra", "pct_venta"]
+        record = {"dolar_name": row[1], "timestamp": timestamp}
+        for key, value in zip(fields, row[2:]):
+            record[key] = float(value) if value != "" else None
+        return [record]
+
+    # Formato ancho: necesitamos el encabezado para saber qué columna es cada tipo
+    if header and header[0] == "timestamp":
+        return [
+            {"dolar_name": name, "timestamp": timestamp, "compra": None, "venta": float(value)}
+            for name, value in zip(header[1:], row[1:])
+            if name in DOLAR_TYPES and value not in ("", "0", "0.0")
+        ]
+    return []
+
+def read_records(dolar_name, start=None, end=None):
+    """
+    Registros crudos de `dolar_name` del CSV caliente entre `start` y `end`
+    (datetimes con zona). Lo usa storage.retention.read_history.
+    """
+    records = []
+    header = None
+    try:
+        with open(HISTORY_CSV_FILE, "r", newline="") as f:
+            for row in csv.reader(f):
+                if not row:
+                    continue
+                if row[0] == "timestamp":
+                    header = row
+                    continue
+                try:
+                    for record in normalize_row(row, header):
+                        if record["dolar_name"] != dolar_name or record["venta"] is None:
+                            continue
+                        ts = parse_timestamp(record["timestamp"])
+                        if (start and ts < start) or (end and ts > end):
+                            continue
+                        records.append(record)
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        return []
+    except OSError as e:
+        log_error(f"Error leyendo CSV histórico: {e}")
+    return records
+
+# ---------------- Lectura para gráficos ----------------
+_series_cache = {} # (limit, mtime_ns, size) -> series
+
+def _tail_lines(path, count, block=64 * 1024):
+    """Últimas `count` líneas completas del archivo, leyendo desde el final."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= count:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    # Si no llegamos al inicio, la primera línea puede estar cortada
+    return lines[-count:] if pos == 0 else lines[1:][-count:]
+
+def history_version():
+    """
+    Versión de los datos del historial: cambia cada vez que un tick agrega filas.
+    Sirve como clave de caché de lo que se deriva del historial (gráficos, resúmenes).
+    """
+    try:
+        stat = os.stat(HISTORY_CSV_FILE)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def _parse_rows(rows, since=None):
+    """
+    Filas del CSV (formato largo: timestamp, dolar_name, compra, venta, ...) ->
+    tuplas (epoch, tipo, compra, venta). Con `since` descarta lo anterior.
+    """
+    cutoff = since.timestamp() if since else None
+    for row in rows:
+        if len(row) < 4 or row[1] not in DOLAR_TYPES:
+            continue
+        try:
+            x = parse_timestamp(row[0]).timestamp()
+            compra = float(row[2]) if row[2] else math.nan
+            venta = float(row[3])
+        except ValueError:
+            continue
+        if cutoff is not None and x < cutoff:
+            continue
+        yield x, row[1], compra, venta
+
+def _parse_series(rows, since=None):
+    """Filas del CSV -> {tipo: (xs, ys)} con la venta."""
+    series = {}
+    for x, name, _, venta in _parse_rows(rows, since):
+        xs, ys = series.setdefault(name, (array("d"), array("d")))
+        xs.append(x)
+        ys.append(venta)
+    return series
+
+def series_since(since):
+    """
+    Venta de todos los ticks desde `since` (datetime con zona) por tipo, como
+    recent_series(). Recorre el CSV completo, que la retención mantiene acotado
+    a RETENTION_RAW_DAYS días.
+    """
+    try:
+        with open(HISTORY_CSV_FILE, "r", newline="") as f:
+            return _parse_series(csv.reader(f), since)
+    except FileNotFoundError:
+        return {}
+    except OSError as e:
+        log_error(f"Error leyendo CSV histórico: {e}")
+        return {}
+
+def recent_series(limit=100):
+    """
+    Últimos `limit` ticks de venta por tipo desde el CSV histórico (que guarda
+    todos los ticks), como {tipo: (xs, ys)} con arrays de floats: xs en segundos
+    epoch, ys en pesos. Lee solo la cola del archivo y se cachea hasta que cambia.
+    """
+    version = history_version()
+    if version is None:
+        return {}
+    key = (limit, *version)
+    cached = _series_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        lines = _tail_lines(HISTORY_CSV_FILE, limit * len(DOLAR_TYPES))
+    except OSError as e:
+        log_error(f"Error leyendo CSV histórico: {e}")
+        return {}
+
+    series = _parse_series(csv.reader(lines))
+    series = {name: (xs[-limit:], ys[-limit:]) for name, (xs, ys) in series.items()}
+    _series_cache.clear()
+    _series_cache[key] = series
+    return series
+
+def recent_rows(ticks=100):
+    """Filas (epoch, tipo, compra, venta) de aproximadamente los últimos `ticks` ticks."""
+    try:
+        lines = _tail_lines(HISTORY_CSV_FILE, ticks * len(DOLAR_TYPES))
+    except FileNotFoundError:
+        return []
+    except OSError as e:
+        log_error(f"Error leyendo CSV histórico: {e}")
+        return []
+    return list(_parse_rows(csv.reader(lines)))
@@ -11,7 +11,7 @@ def load_initial_rates():
         dict: Un diccionario donde la clave es la fecha ('YYYY-MM-DD') y el valor son 
               las cotizaciones de ese día.
     """
-    return load_json(INITIAL_RATES_FILE)
+    return load_json(INITIAL_RATES_FILE) or {}
 
 def save_initial_rates_by_day(rates):
     """
@@ -0,0 +1,81 @@
+# storage/job_state.py
+"""
+Estado durable de los jobs del scheduler (data/job_state.json).
+
+Guarda la última corrida de cada job y los avisos ya enviados por día
+(apertura, cierre, resumen diario), para que un reinicio o el despertar de
+la instancia no repita mensajes ni pierda el resumen de las 17:01. El último
+snapshot ya queda persistido en DATA_FILE y SNAPSHOT_FILE en cada tick.
+
+Solo escribe el worker líder; el estado se lee del disco una vez y después
+se mantiene en memoria (cada cambio se guarda con save_json, atómico).
+"""
+
+import threading
+from datetime import date, datetime, timezone
+
+from config.constants import JOB_STATE_FILE
+from utils.file_helpers import load_json, save_json
+
+_lock = threading.Lock()
+_state = None
+
+def _load():
+    """Estado en memoria, leído del disco la primera vez. Llamar con _lock tomado."""
+    global _state
+    if _state is None:
+        data = load_json(JOB_STATE_FILE)
+        _state = data if isinstance(data, dict) else {}
+        _state.setdefault("jobs", {})
+        _state.setdefault("days", {})
+    return _state
+
+# ---------------- Corridas de jobs ----------------
+def record_run(job_id: str, scheduled: datetime, outcome: str):
+    """Registra la corrida de un job: hora programada, hora de fin y resultado."""
+    with _lock:
+        state = _load()
+        state["jobs"][job_id] = {
+            "scheduled": scheduled.isoformat() if scheduled else None,
+            "finished": datetime.now(timezone.utc).isoformat(),
+            "outcome": outcome,
+        }
+        save_json(JOB_STATE_FILE, state)
+
+def last_run(job_id: str):
+    """Última corrida registrada de `job_id` ({"scheduled", "finished", "outcome"}) o None."""
+    with _lock:
+        run = _load()["jobs"].get(job_id)
+    return dict(run) if run else None
+
+def last_finished(job_id: str):
+    """Hora (UTC) en que terminó la última corrida de `job_id`, o None."""
+    run = last_run(job_id)
+    try:
+        return datetime.fromisoformat(run["finished"]) if run else None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+# ---------------- Avisos por día ----------------
+def flag_sent(day: date, key: str) -> bool:
+    """True si el aviso `key` (ej. "market_open_sent") ya se envió el día `day`."""
+    with _lock:
+        return bool(_load()["days"].get(day.isoformat(), {}).get(key))
+
+def mark_sent(day: date, key: str):
+    """Marca el aviso `key` como enviado el día `day`."""
+    with _lock:
+        state = _load()
+        state["days"].setdefault(day.isoformat(), {})[key] = True
+        save_json(JOB_STATE_FILE, state)
+
+def prune_days(today: date):
+    """Descarta las marcas de días anteriores a `today`."""
+    with _lock:
+        state = _load()
+        old = [day for day in state["days"] if day < today.isoformat()]
+        if not old:
+            return
+        for day in old:
+            del state["days"][day]
+        save_json(JOB_STATE_FILE, state)
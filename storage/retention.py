@@ -0,0 +1,254 @@
+# storage/retention.py
+"""
+Retención del historial en dos niveles:
+
+- Caliente: history.json y dolar_history.csv guardan solo los últimos
+  RETENTION_RAW_DAYS días de ticks crudos.
+- Archivo (data/archive/): lo que sale del nivel caliente (de ambos archivos)
+  se guarda comprimido en segmentos mensuales (raw-YYYY-MM.jsonl.gz) junto con
+  rollups por hora (hourly-YYYY-MM.jsonl.gz) y por día (daily-YYYY.jsonl.gz).
+  Los segmentos crudos se borran pasados RETENTION_ARCHIVE_RAW_DAYS; los
+  rollups quedan.
+
+logs/errors.log se rota por tamaño en utils/logger.py.
+
+read_history() lee ambos niveles (y los dos archivos calientes), así que
+quien consulta no necesita saber dónde quedó cada registro ni qué backend
+lo escribió.
+"""
+
+import csv
+import gzip
+import json
+import os
+from datetime import timedelta
+
+from config.constants import (
+    ARCHIVE_DIR,
+    HISTORY_JSON_FILE,
+    HISTORY_CSV_FILE,
+    INITIAL_RATES_FILE,
+    RETENTION_RAW_DAYS,
+    RETENTION_ARCHIVE_RAW_DAYS,
+    RETENTION_INITIAL_RATES_DAYS,
+)
+from storage.json_history import history_lock
+from storage.csv_history import csv_lock, normalize_row, read_records
+from utils.file_helpers import ensure_dirs, load_json, save_json, log_error
+from utils.helpers import now_argentina, parse_timestamp
+
+RESOLUTIONS = ("raw", "hour", "day")
+
+# ---------------- Segmentos comprimidos ----------------
+def _segment_path(kind, dt):
+    """Ruta del segmento que contiene `dt`: mensual para raw/hour, anual para day."""
+    period = dt.strftime("%Y") if kind == "daily" else dt.strftime("%Y-%m")
+    return ARCHIVE_DIR / f"{kind}-{period}.jsonl.gz"
+
+def _append_segments(kind, records):
+    """Agrega registros (con 'dolar_name' y 'timestamp') a sus segmentos gzip."""
+    by_path = {}
+    for record in records:
+        by_path.setdefault(_segment_path(kind, parse_timestamp(record["timestamp"])), []).append(record)
+
+    for path, items in by_path.items():
+        ensure_dirs(path)
+        # gzip en modo append agrega un nuevo "member"; gzip.open los lee en secuencia
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(item) + "\n")
+
+def _read_segments(kind, start=None, end=None):
+    if not ARCHIVE_DIR.exists():
+        return
+    for path in sorted(ARCHIVE_DIR.glob(f"{kind}-*.jsonl.gz")):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    ts = parse_timestamp(record["timestamp"])
+                    if (start and ts < start) or (end and ts > end):
+                        continue
+                    yield record
+        except (OSError, EOFError, ValueError) as e:
+            log_error(f"Error leyendo segmento de archivo {path}: {e}")
+
+# ---------------- Rollups ----------------
+def _bucket_start(dt, resolution):
+    if resolution == "day":
+        return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+def rollup(dolar_name, records, resolution):
+    """
+    Agrupa ticks crudos de un tipo por hora o por día.
+    Cada rollup conserva compra/venta de cierre (para leerse igual que un tick)
+    más apertura, mínimo, máximo y cantidad de ticks de la venta.
+    """
+    buckets = {}
+    for record in sorted(records, key=lambda r: parse_timestamp(r["timestamp"])):
+        ts = parse_timestamp(record["timestamp"])
+        key = _bucket_start(ts, resolution)
+        venta = record["venta"]
+        b = buckets.get(key)
+        if b is None:
+            buckets[key] = {
+                "dolar_name": dolar_name,
+                "timestamp": key.isoformat(),
+                "compra": record.get("compra"),
+                "venta": venta,
+                "open_venta": venta,
+                "min_venta": venta,
+                "max_venta": venta,
+                "ticks": 1,
+            }
+        else:
+            b["compra"] = record.get("compra")
+            b["venta"] = venta
+            b["min_venta"] = min(b["min_venta"], venta)
+            b["max_venta"] = max(b["max_venta"], venta)
+            b["ticks"] += 1
+    return list(buckets.values())
+
+# ---------------- Lectura transparente ----------------
+def read_history(dolar_name, start=None, end=None, resolution="raw"):
+    """
+    Historial de `dolar_name` entre `start` y `end` (datetimes con zona) leyendo
+    el nivel caliente y el archivo. Con resolution="hour"/"day" devuelve rollups.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Resolución inválida: {resolution}")
+
+    # Nivel caliente: el CSV guarda todos los ticks y history.json solo los que
+    # cambiaron (con los porcentajes); ante el mismo timestamp queda el de JSON.
+    hot = {}
+    json_hot = (load_json(HISTORY_JSON_FILE) or {}).get(dolar_name, [])
+    for record in read_records(dolar_name, start, end) + json_hot:
+        ts = parse_timestamp(record["timestamp"])
+        if (start and ts < start) or (end and ts > end):
+            continue
+        hot[ts] = record
+    hot = [hot[k] for k in sorted(hot)]
+
+    kind = {"raw": "raw", "hour": "hourly", "day": "daily"}[resolution]
+    archived = [r for r in _read_segments(kind, start, end) if r.get("dolar_name") == dolar_name]
+    if resolution != "raw":
+        hot = rollup(dolar_name, hot, resolution)
+
+    # Deduplicamos por timestamp: si la retención se cortó a mitad de camino
+    # un registro puede estar tanto en el archivo como en el nivel caliente, y
+    # con los dos backends activos el mismo tick se archiva desde ambos.
+    merged = {}
+    for record in archived + hot:
+        merged[parse_timestamp(record["timestamp"])] = record
+    return [merged[k] for k in sorted(merged)]
+
+# ---------------- Job de retención ----------------
+def _trim_json_history(cutoff):
+    with history_lock:
+        history = load_json(HISTORY_JSON_FILE) or {}
+        expired = {}
+        for name, records in history.items():
+            keep, old = [], []
+            for record in records:
+                try:
+                    (old if parse_timestamp(record["timestamp"]) < cutoff else keep).append(record)
+                except (KeyError, TypeError, ValueError):
+                    keep.append(record)
+            if old:
+                expired[name] = old
+                history[name] = keep
+
+        if not expired:
+            return 0
+
+        # Primero archivamos y después recortamos: si algo falla no se pierde nada
+        _archive(expired)
+        save_json(HISTORY_JSON_FILE, history)
+        return sum(len(rs) for rs in expired.values())
+
+def _archive(expired):
+    """Archiva {tipo: [registros]} en los segmentos crudos y en los rollups por hora y día."""
+    _append_segments("raw", [{"dolar_name": n, **r} for n, rs in expired.items() for r in rs])
+    _append_segments("hourly", [b for n, rs in expired.items() for b in rollup(n, rs, "hour")])
+    _append_segments("daily", [b for n, rs in expired.items() for b in rollup(n, rs, "day")])
+
+def _trim_csv_history(cutoff):
+    if not os.path.isfile(HISTORY_CSV_FILE):
+        return 0
+
+    tmp_path = f"{HISTORY_CSV_FILE}.retention.tmp"
+    expired = {}
+    moved = 0
+    with csv_lock:
+        header = None
+        with open(HISTORY_CSV_FILE, "r", newline="") as src, open(tmp_path, "w", newline="") as keep:
+            for line in src:
+                row = next(csv.reader([line]), [])
+                if row and row[0] == "timestamp":
+                    # Los encabezados quedan: definen las columnas de las filas anchas que sigan
+                    header = row
+                    keep.write(line)
+                    continue
+                try:
+                    old = parse_timestamp(row[0]) < cutoff
+                    records = normalize_row(row, header) if old else []
+                except (IndexError, ValueError):
+                    old, records = False, [] # filas ilegibles quedan en el archivo caliente
+                if not old or not records:
+                    keep.write(line)
+                    continue
+                for record in records:
+                    if record["venta"] is not None:
+                        expired.setdefault(record["dolar_name"], []).append(record)
+                moved += 1
+
+        if not moved:
+            os.remove(tmp_path)
+            return 0
+        # Mismos segmentos que history.json. Primero archivamos y después recortamos
+        _archive(expired)
+        os.replace(tmp_path, HISTORY_CSV_FILE)
+    return moved
+
+def _trim_initial_rates(today):
+    initials = load_json(INITIAL_RATES_FILE) or {}
+    cutoff = (today - timedelta(days=RETENTION_INITIAL_RATES_DAYS)).isoformat()
+    old = {day: rates for day, rates in initials.items() if day < cutoff}
+    if not old:
+        return 0
+    _append_segments("initial_rates", [
+        {"timestamp": f"{day}T00:00:00", "rates": rates} for day, rates in old.items()
+    ])
+    save_json(INITIAL_RATES_FILE, {day: rates for day, rates in initials.items() if day >= cutoff})
+    return len(old)
+
+def _drop_old_raw_segments(now):
+    """Borra segmentos crudos de meses completamente fuera de RETENTION_ARCHIVE_RAW_DAYS."""
+    if not ARCHIVE_DIR.exists():
+        return 0
+    limit = (now - timedelta(days=RETENTION_ARCHIVE_RAW_DAYS)).strftime("%Y-%m")
+    removed = 0
+    for path in ARCHIVE_DIR.glob("raw-*.jsonl.gz"):
+        if path.name[4:11] < limit:
+            path.unlink()
+            removed += 1
+    return removed
+
+def run_retention(now=None):
+    """Job diario: archiva y recorta los archivos calientes. Devuelve un resumen de lo hecho."""
+    now = now or now_argentina()
+    cutoff = now - timedelta(days=RETENTION_RAW_DAYS)
+    summary = {}
+    for key, step in (
+        ("json", lambda: _trim_json_history(cutoff)),
+        ("csv", lambda: _trim_csv_history(cutoff)),
+        ("initial_rates", lambda: _trim_initial_rates(now.date())),
+        ("raw_segments_removed", lambda: _drop_old_raw_segments(now)),
+    ):
+        try:
+            summary[key] = step()
+        except Exception as e:
+            log_error(f"Error en retención ({key}): {e}")
+    print(f"🧹 Retención completada: {summary}")
+    return summary
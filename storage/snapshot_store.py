@@ -0,0 +1,90 @@
+# storage/snapshot_store.py
+
+import os
+import threading
+from datetime import datetime
+
+from config.constants import SNAPSHOT_FILE
+from models.changes import ChangeSet
+from models.snapshot import Snapshot
+from utils.file_helpers import load_json, save_json
+
+# Cache en memoria del último snapshot leído: solo se vuelve a parsear el
+# archivo cuando cambia su mtime, así que leerlo en cada request es barato.
+_lock = threading.Lock()
+_cached = None
+_cached_changes = None # ChangeSet publicado junto a _cached (None si no vino)
+_cached_mtime = None
+
+def publish_snapshot(snapshot: Snapshot, changes: ChangeSet = None):
+    """
+    Publica el snapshot en el archivo compartido para que todos los workers lo lean.
+    Lo escribe el worker líder después de cada tick (escritura atómica vía save_json),
+    junto con el ChangeSet del tick; un fetch de la web lo publica sin cambios.
+    """
+    global _cached, _cached_changes, _cached_mtime
+    data = {
+        "timestamp": snapshot.timestamp.isoformat(),
+        "source_time": snapshot.source_time.isoformat() if snapshot.source_time else None,
+        "rates": snapshot.to_dict(),
+    }
+    if changes is not None:
+        data["changes"] = changes.to_dict()
+        data["opened"] = changes.opened
+        # El mismo ChangeSet que van a leer los demás workers (sobre el snapshot publicado)
+        changes = ChangeSet.from_dict(snapshot, data["changes"], changes.opened)
+    save_json(SNAPSHOT_FILE, data)
+    with _lock:
+        _cached, _cached_changes = snapshot, changes
+        _cached_mtime = _mtime()
+
+def load_shared_snapshot():
+    """
+    Devuelve el último Snapshot publicado (o None si todavía no hay ninguno).
+    El mismo objeto se reutiliza mientras el archivo no cambie.
+    """
+    global _cached, _cached_changes, _cached_mtime
+    mtime = _mtime()
+    if mtime is None:
+        return None
+
+    with _lock:
+        if _cached is not None and mtime == _cached_mtime:
+            return _cached
+
+    data = load_json(SNAPSHOT_FILE)
+    if not isinstance(data, dict) or not data.get("rates"):
+        return None
+
+    try:
+        snapshot = Snapshot.from_rates(
+            data["rates"],
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            source_time=datetime.fromisoformat(data["source_time"]) if data.get("source_time") else None,
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+    changes = ChangeSet.from_dict(snapshot, data["changes"], bool(data.get("opened"))) if data.get("changes") else None
+
+    with _lock:
+        _cached, _cached_changes, _cached_mtime = snapshot, changes, mtime
+    return snapshot
+
+def shared_changes(snapshot: Snapshot):
+    """
+    ChangeSet que el líder publicó junto a `snapshot` (el que devolvió
+    load_shared_snapshot), o None si ese snapshot no vino de un tick o ya
+    fue reemplazado por otro.
+    """
+    with _lock:
+        return _cached_changes if _cached is snapshot else None
+
+def cached_snapshot():
+    """Último snapshot conocido por este worker, sin tocar el disco (None si no hay)."""
+    return _cached
+
+def _mtime():
+    try:
+        return os.stat(SNAPSHOT_FILE).st_mtime_ns
+    except OSError:
+        return None
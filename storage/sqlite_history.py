@@ -0,0 +1,144 @@
+# storage/sqlite_history.py
+
+import sqlite3
+import threading
+
+from config.constants import SQLITE_DB_FILE
+from utils.file_helpers import ensure_dirs, log_error
+from utils.helpers import parse_timestamp
+
+# Una conexión por hilo: el scheduler escribe desde su thread y las rutas web
+# leen desde el suyo. En modo WAL los lectores nunca bloquean al escritor.
+_local = threading.local()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cotizaciones (
+    id          INTEGER PRIMARY KEY,
+    dolar_name  TEXT    NOT NULL,
+    timestamp   TEXT    NOT NULL,
+    ts          REAL    NOT NULL,
+    compra      REAL,
+    venta       REAL    NOT NULL,
+    diff_compra REAL,
+    diff_venta  REAL,
+    pct_compra  REAL,
+    pct_venta   REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_cotizaciones_name_ts ON cotizaciones (dolar_name, ts);
+CREATE INDEX IF NOT EXISTS idx_cotizaciones_ts ON cotizaciones (ts);
+"""
+
+_INSERT = """
+INSERT OR IGNORE INTO cotizaciones
+    (dolar_name, timestamp, ts, compra, venta, diff_compra, diff_venta, pct_compra, pct_venta)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_BUCKETS = {"hour": 3600, "day": 86400}
+
+def get_connection(db_path=None) -> sqlite3.Connection:
+    """Devuelve la conexión del hilo actual (la crea y configura la primera vez)."""
+    path = str(db_path or SQLITE_DB_FILE)
+    conns = _local.__dict__.setdefault("conns", {})
+    conn = conns.get(path)
+    if conn is None:
+        ensure_dirs(path)
+        conn = sqlite3.connect(path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        conns[path] = conn
+    return conn
+
+def _row_params(row: dict):
+    timestamp = row["timestamp"]
+    return (
+        row["dolar_name"],
+        timestamp,
+        parse_timestamp(timestamp).timestamp(),
+        row.get("compra"),
+        row["venta"],
+        row.get("diff_compra"),
+        row.get("diff_venta"),
+        row.get("pct_compra"),
+        row.get("pct_venta"),
+    )
+
+def insert_rows(rows, db_path=None) -> int:
+    """
+    Inserta todas las filas de un tick en una única transacción.
+    Cada fila es un dict con dolar_name, timestamp, compra, venta y opcionalmente
+    diff_*/pct_*. Las filas repetidas (mismo tipo y timestamp) se ignoran.
+    Retorna la cantidad de filas nuevas.
+    """
+    if not rows:
+        return 0
+    try:
+        conn = get_connection(db_path)
+        with conn:
+            cur = conn.executemany(_INSERT, [_row_params(r) for r in rows])
+        return cur.rowcount
+    except Exception as e:
+        log_error(f"Error guardando historial SQLite: {e}")
+        return 0
+
+# ---------------- Consultas ----------------
+def get_latest(dolar_name=None, db_path=None):
+    """Última cotización de cada tipo (o solo de `dolar_name`) como lista de dicts."""
+    conn = get_connection(db_path)
+    query = """
+        SELECT c.* FROM cotizaciones c
+        JOIN (SELECT dolar_name, MAX(ts) AS ts FROM cotizaciones GROUP BY dolar_name) last
+          ON c.dolar_name = last.dolar_name AND c.ts = last.ts
+    """
+    params = ()
+    if dolar_name:
+        query += " WHERE c.dolar_name = ?"
+        params = (dolar_name,)
+    return [dict(r) for r in conn.execute(query, params)]
+
+def get_range(dolar_name, start=None, end=None, db_path=None):
+    """Cotizaciones de `dolar_name` entre `start` y `end` (datetimes, inclusive), ordenadas por fecha."""
+    conn = get_connection(db_path)
+    lo = start.timestamp() if start else float("-inf")
+    hi = end.timestamp() if end else float("inf")
+    rows = conn.execute(
+        "SELECT * FROM cotizaciones WHERE dolar_name = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+        (dolar_name, lo, hi),
+    )
+    return [dict(r) for r in rows]
+
+def get_aggregate(dolar_name, bucket="hour", start=None, end=None, db_path=None):
+    """
+    Agregados por hora o por día: apertura/cierre/mín/máx/promedio de venta y cantidad de ticks.
+    `bucket_start` es el inicio del intervalo en epoch UTC.
+    """
+    size = _BUCKETS[bucket]
+    conn = get_connection(db_path)
+    lo = start.timestamp() if start else float("-inf")
+    hi = end.timestamp() if end else float("inf")
+    rows = conn.execute(
+        """
+        SELECT bucket_start,
+               COUNT(*)    AS ticks,
+               MIN(venta)  AS min_venta,
+               MAX(venta)  AS max_venta,
+               AVG(venta)  AS avg_venta,
+               AVG(compra) AS avg_compra,
+               MAX(CASE WHEN rn_asc = 1 THEN venta END)  AS open_venta,
+               MAX(CASE WHEN rn_desc = 1 THEN venta END) AS close_venta
+        FROM (
+            SELECT compra, venta,
+                   CAST(ts / :size AS INTEGER) * :size AS bucket_start,
+                   ROW_NUMBER() OVER (PARTITION BY CAST(ts / :size AS INTEGER) ORDER BY ts)      AS rn_asc,
+                   ROW_NUMBER() OVER (PARTITION BY CAST(ts / :size AS INTEGER) ORDER BY ts DESC) AS rn_desc
+            FROM cotizaciones
+            WHERE dolar_name = :name AND ts BETWEEN :lo AND :hi
+        )
+        GROUP BY bucket_start
+        ORDER BY bucket_start
+        """,
+        {"size": size, "name": dolar_name, "lo": lo, "hi": hi},
+    )
+    return [dict(r) for r in rows]
@@ -1,7 +1,6 @@
 # storage/supabase_client.py
 
 import os
-import requests
 from utils.file_helpers import log_error # Reutilizamos el logger
 
 # --- Configuración ---
@@ -34,6 +33,7 @@ def insertar_cotizacion_supabase(dolar_name, compra, venta, diff_compra, diff_ve
         "timestamp": timestamp,
     }
     try:
+        import requests # diferido: no pesa en el arranque
         response = requests.post(url, json=data, headers=headers)
         if response.status_code not in [200, 201]:
             log_error(f"Error guardando en Supabase (status {response.status_code}): {response.text}")
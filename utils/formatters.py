@@ -1,4 +1,7 @@
 
+from models.snapshot import Snapshot
+from models.changes import diff_snapshots
+
 def emoji(diff):
     """
     Devuelve un emoji basado en la diferencia (diff) de la cotización.
@@ -6,40 +9,111 @@ def emoji(diff):
     """
     return "🟢" if diff > 0 else "🔴" if diff < 0 else "🟡"
 
+def pct_str(diff, base):
+    """Formatea una variación porcentual con signo ('+0.00%' si la base es 0)."""
+    return f"{(diff / base * 100):+.2f}%" if base else "+0.00%"
+
+def format_change(name, compra, venta, title=None):
+    """
+    Bloque de mensaje de Telegram con la variación de compra y venta de un tipo
+    contra el tick anterior. `compra` y `venta` son Change (ver models.changes).
+    """
+    return (
+        f"{title or name.title()}\n"
+        f"   Compra: {emoji(compra.diff)} ${compra.value:.2f} ({compra.diff:+.2f}, {compra.pct:+.2f}%)\n"
+        f"   Venta:  {emoji(venta.diff)} ${venta.value:.2f} ({venta.diff:+.2f}, {venta.pct:+.2f}%)"
+    )
+
+class CardView:
+    """
+    Vista de una tarjeta de cotización para la plantilla HTML.
+
+    Guarda solo referencias a los Change de compra y venta (con la variación
+    contra la apertura ya calculada); los strings ('1450.00', '+0.35%', emojis)
+    se calculan recién cuando Jinja2 los pide.
+    """
+    __slots__ = ("change_compra", "change_venta")
+
+    def __init__(self, change_compra, change_venta):
+        self.change_compra = change_compra
+        self.change_venta = change_venta
+
+    @property
+    def diff_compra(self):
+        return self.change_compra.diff_open
+
+    @property
+    def diff_venta(self):
+        return self.change_venta.diff_open
+
+    @property
+    def compra(self):
+        return f"{self.change_compra.value:.2f}"
+
+    @property
+    def venta(self):
+        return f"{self.change_venta.value:.2f}"
+
+    @property
+    def apertura_compra(self):
+        return f"{self.change_compra.open:.2f}"
+
+    @property
+    def apertura_venta(self):
+        return f"{self.change_venta.open:.2f}"
+
+    @property
+    def quote(self):
+        """(compra, venta) actuales."""
+        return self.change_compra.value, self.change_venta.value
+
+    @property
+    def opening(self):
+        """(compra, venta) de apertura."""
+        return self.change_compra.open, self.change_venta.open
+
+    @property
+    def emoji_compra(self):
+        return emoji(self.diff_compra)
+
+    @property
+    def emoji_venta(self):
+        return emoji(self.diff_venta)
+
+    # Se mantienen los nombres usados por la plantilla
+    apertura_emoji_compra = emoji_compra
+    apertura_emoji_venta = emoji_venta
+
+    @property
+    def pct_compra(self):
+        return f"{self.change_compra.pct_open:+.2f}%"
+
+    @property
+    def pct_venta(self):
+        return f"{self.change_venta.pct_open:+.2f}%"
+
+    def __getitem__(self, key):
+        # Compatibilidad con el acceso tipo dict (rates["compra"])
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
 def prepare_data(data_dict, initial_dict=None):
     """
-    Prepara y formatea los datos de cotización para el renderizado HTML,
+    Prepara los datos de cotización para el renderizado HTML,
     incluyendo la comparación con las tasas de apertura.
+
+    Acepta Snapshots o dicts de rates y devuelve {tipo: CardView}; las
+    variaciones salen del motor de cambios y el formateo a texto se hace de
+    forma diferida al renderizar.
     """
-    prepared = {}
-    for name, rates in data_dict.items():
-        compra = float(rates.get("compra", rates)) if isinstance(rates, dict) else float(rates)
-        venta = float(rates.get("venta", rates)) if isinstance(rates, dict) else float(rates)
-
-        # 🔹 Apertura segura: si no existe, toma el valor actual
-        apertura_compra = float(initial_dict.get(name, {}).get("compra", compra)) if initial_dict else compra
-        apertura_venta = float(initial_dict.get(name, {}).get("venta", venta)) if initial_dict else venta
-
-        diff_compra = compra - apertura_compra
-        diff_venta = venta - apertura_venta
-        pct_compra = f"{(diff_compra / apertura_compra * 100):+.2f}%" if apertura_compra else "+0.00%"
-        pct_venta = f"{(diff_venta / apertura_venta * 100):+.2f}%" if apertura_venta else "+0.00%"
-
-        # Usamos la función emoji de este mismo módulo
-        emoji_compra = emoji(diff_compra)
-        emoji_venta = emoji(diff_venta)
-
-        prepared[name] = {
-            "compra": f"{compra:.2f}",
-            "venta": f"{venta:.2f}",
-            "apertura_compra": f"{apertura_compra:.2f}",
-            "apertura_venta": f"{apertura_venta:.2f}",
-            "apertura_emoji_compra": emoji_compra,
-            "apertura_emoji_venta": emoji_venta,
-            "emoji_compra": emoji_compra,
-            "emoji_venta": emoji_venta,
-            "pct_compra": pct_compra,
-            "pct_venta": pct_venta
-        }
-
-    return prepared
\ No newline at end of file
+    snapshot = Snapshot.coerce(data_dict)
+    initial = Snapshot.coerce(initial_dict) if initial_dict else None
+
+    # 🔹 Apertura segura: si un tipo no tiene apertura, se compara contra el valor actual
+    return card_views(diff_snapshots(snapshot, opening=initial))
+
+def card_views(changes):
+    """{tipo: CardView} a partir de un ChangeSet (ej. el que publicó el líder en el tick)."""
+    return {name: CardView(compra, venta) for name, (compra, venta) in changes.items()}
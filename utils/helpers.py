@@ -6,6 +6,16 @@ def now_argentina() -> datetime:
     """Devuelve el objeto datetime actual en la zona horaria de Buenos Aires."""
     return datetime.now(ZoneInfo("America/Argentina/Buenos_Aires"))
 
+def parse_timestamp(timestamp_str: str) -> datetime:
+    """
+    Parsea un timestamp ISO del historial. Los registros viejos no tienen zona
+    horaria ('2025-10-27T15:01:00.48'); se asumen en hora de Buenos Aires.
+    """
+    dt = datetime.fromisoformat(timestamp_str)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=ZoneInfo("America/Argentina/Buenos_Aires"))
+    return dt
+
 def get_full_date() -> str:
     """
     Formatea la fecha actual en un formato legible para el título de la web.
@@ -0,0 +1,188 @@
+# utils/logger.py
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config.constants import ERROR_LOG, ERROR_LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_DEDUP_SECONDS, LOG_QUEUE_SIZE
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOGGER_NAME = "dolar_bot"
+
+_setup_lock = threading.Lock()
+_listener = None
+_queue = None
+
+class JsonFormatter(logging.Formatter):
+    """Un registro JSON por línea: ts, level, logger, msg y campos extra."""
+
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="seconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        data.update(getattr(record, "fields", None) or {})
+        if getattr(record, "repeated", 0):
+            data["repeated"] = record.repeated
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class DedupFilter(logging.Filter):
+    """
+    Descarta mensajes idénticos repetidos dentro de `window` segundos.
+    Cuando el mensaje vuelve a pasar, lleva en `repeated` cuántas veces se suprimió.
+    Se aplica antes de encolar, así una tormenta de errores iguales casi no cuesta nada.
+    """
+
+    def __init__(self, window):
+        super().__init__()
+        self.window = window
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry and now - entry[0] < self.window:
+                entry[1] += 1
+                return False
+            record.repeated = entry[1] if entry else 0
+            self._seen[key] = [now, 0]
+            if len(self._seen) > 1000:
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window}
+        return True
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler con cola acotada: si el writer no da abasto, descarta en vez de bloquear."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+class LockedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler seguro entre procesos: con uvicorn --workers N todos
+    escriben el mismo errors.log. Cada escritura (y la rotación) se hace con un
+    lock exclusivo sobre `<archivo>.lock`, y si otro worker ya rotó el archivo
+    se reabre antes de escribir, así nadie sigue escribiendo en errors.log.1 ni
+    rota dos veces. Solo lo usa el thread escritor: quien loguea no espera el lock.
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(filename, *args, **kwargs)
+        self._lock_fd = os.open(f"{self.baseFilename}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+
+    @contextmanager
+    def _process_lock(self):
+        if fcntl:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        else:
+            os.lseek(self._lock_fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._lock_fd, msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._lock_fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._lock_fd, msvcrt.LK_UNLCK, 1)
+
+    def _reopen_if_rotated(self):
+        """Cierra el stream si apunta a un archivo que ya no es errors.log (lo rotó otro worker)."""
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(self.stream.fileno())
+        if current is None or (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+            self.stream.close()
+            self.stream = None # emit() lo vuelve a abrir
+
+    def emit(self, record):
+        try:
+            with self._process_lock():
+                self._reopen_if_rotated()
+                super().emit(record)
+        except OSError:
+            self.handleError(record)
+
+    def close(self):
+        super().close()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+def get_logger() -> logging.Logger:
+    """
+    Logger de la app. La primera llamada arma el pipeline:
+    logger -> DedupFilter -> cola acotada -> thread escritor -> (errors.log rotativo en JSON, consola).
+    Quien loguea nunca toca el disco.
+    """
+    global _listener, _queue
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return logger
+
+    with _setup_lock:
+        if _listener is not None:
+            return logger
+
+        os.makedirs(os.path.dirname(ERROR_LOG), exist_ok=True)
+        file_handler = LockedRotatingFileHandler(
+            ERROR_LOG, maxBytes=ERROR_LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+        )
+        file_handler.setFormatter(JsonFormatter())
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter("⚠️ %(message)s"))
+
+        q = _queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        queue_handler = DroppingQueueHandler(q)
+        queue_handler.addFilter(DedupFilter(LOG_DEDUP_SECONDS))
+
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(queue_handler)
+
+        _listener = QueueListener(q, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
+        # Al salir vaciamos la cola para no perder los últimos errores
+        atexit.register(stop_logging)
+    return logger
+
+def log_backlog():
+    """(registros esperando al thread escritor, registros descartados por cola llena)."""
+    return (_queue.qsize() if _queue is not None else 0), DroppingQueueHandler.dropped
+
+def stop_logging():
+    """Detiene el thread escritor después de escribir lo que quede en la cola."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            logging.getLogger(LOGGER_NAME).handlers.clear()
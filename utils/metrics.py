@@ -0,0 +1,181 @@
+# utils/metrics.py
+"""
+Métricas en memoria con salida en formato de texto de Prometheus (GET /metrics).
+
+Implementación mínima sin dependencias: contadores, gauges e histogramas con
+labels, protegidos por un lock por métrica. Registrar una observación cuesta
+un bisect y una suma, así que puede quedar siempre activo en producción.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = []
+
+def _label_key(labels: dict):
+    return tuple(sorted(labels.items()))
+
+def _escape_label(value):
+    """Escapa \\, " y saltos de línea como pide el formato de texto de Prometheus."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def total(self, **labels):
+        """Suma de todas las series cuyos labels incluyen `labels` (p. ej. outcome="missed" de todos los jobs)."""
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(v for k, v in self._values.items() if wanted <= set(k))
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [f"{self.name}{_format_labels(k)} {v}" for k, v in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+        self._series = {} # key -> [counts por bucket..., sum, count]
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Mide la duración del bloque `with` y la registra en el histograma."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels):
+        """(sum, count) de una serie; útil para calcular promedios sin parsear /metrics."""
+        series = self._series.get(_label_key(labels))
+        return (series[-2], series[-1]) if series else (0.0, 0)
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+class RollingRate(_Metric):
+    """
+    Proporción de fallas en los últimos `size` eventos. A diferencia de un
+    Counter no arrastra la historia completa, así que sirve para decidir si
+    algo está fallando *ahora* (p. ej. el readiness de /ready).
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help_text, size=20):
+        super().__init__(name, help_text)
+        self._events = deque(maxlen=size)
+
+    def record(self, ok):
+        with self._lock:
+            self._events.append(bool(ok))
+
+    def rate(self):
+        """Fracción de fallas (0..1) y cantidad de eventos considerados."""
+        with self._lock:
+            events = list(self._events)
+        if not events:
+            return 0.0, 0
+        return events.count(False) / len(events), len(events)
+
+    def render(self):
+        return self._header() + [f"{self.name} {self.rate()[0]}"]
+
+def render_metrics() -> str:
+    """Todas las métricas registradas en formato de exposición de Prometheus."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# ---------------- Métricas de la app ----------------
+UPSTREAM_FETCH_SECONDS = Histogram("dolar_upstream_fetch_seconds", "Duración de las consultas a dolarapi.com")
+UPSTREAM_FETCH_TOTAL = Counter("dolar_upstream_fetch_total", "Consultas a dolarapi.com por resultado")
+UPSTREAM_ERROR_RATE = RollingRate("dolar_upstream_error_rate", "Fracción de consultas fallidas a dolarapi.com entre las últimas 20")
+SNAPSHOT_CACHE_TOTAL = Counter("dolar_snapshot_cache_total", "Lecturas del snapshot compartido (hit) vs. fetch a la API (miss)")
+STORAGE_WRITE_SECONDS = Histogram("dolar_storage_write_seconds", "Duración de escritura por destino de historial")
+FORMAT_MESSAGE_SECONDS = Histogram("dolar_format_message_seconds", "Duración de format_message")
+TEMPLATE_RENDER_SECONDS = Histogram("dolar_template_render_seconds", "Duración del render de plantillas HTML")
+SCHEDULER_TICK_SECONDS = Histogram("dolar_scheduler_tick_seconds", "Duración de cada tick de check_and_save_dolar", buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+SCHEDULER_LAG_SECONDS = Histogram("dolar_scheduler_lag_seconds", "Demora entre la hora programada de un job y su ejecución", buckets=(0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300))
+SCHEDULER_JOBS_TOTAL = Counter("dolar_scheduler_jobs_total", "Jobs del scheduler por resultado (executed, error, missed)")
+WEBHOOK_SECONDS = Histogram("dolar_webhook_seconds", "Duración del procesamiento de /webhook")
+WEBHOOK_INFLIGHT = Gauge("dolar_webhook_inflight", "Updates de Telegram en proceso en este worker")
+ALERTS_TOTAL = Counter("dolar_alerts_total", "Alertas de cambios enviadas (sent), agrupadas con otras pendientes (coalesced), descartadas por histéresis (suppressed) o con error de envío (failed)")
+TELEGRAM_SEND_TOTAL = Counter("dolar_telegram_send_total", "Envíos a la API de Telegram por método y resultado")
+TELEGRAM_SEND_SECONDS = Histogram("dolar_telegram_send_seconds", "Duración de los envíos a la API de Telegram")
+CHART_CACHE_TOTAL = Counter("dolar_chart_cache_total", "Gráficos del bot renderizados (render) vs. servidos desde caché (hit)")
+CARD_CACHE_TOTAL = Counter("dolar_card_cache_total", "Tarjetas de la web renderizadas (render) vs. servidas desde caché (hit)")
+CHART_SEND_TOTAL = Counter("dolar_chart_send_total", "Gráficos enviados subiendo la imagen (upload) o reusando el file_id de Telegram (file_id)")
@@ -1,20 +1,50 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+from config.constants import TELEGRAM_API_URL
+from utils.metrics import TELEGRAM_SEND_TOTAL, TELEGRAM_SEND_SECONDS
+
 load_dotenv()
 
 TOKEN = os.getenv("TELEGRAM_TOKEN")
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
+def _post(method: str, payload: dict, files: dict = None):
+    """POST a la Bot API registrando duración y resultado en /metrics."""
+    import requests # diferido: no pesa en el arranque
+    url = f"{TELEGRAM_API_URL}/bot{TOKEN}/{method}"
+    try:
+        with TELEGRAM_SEND_SECONDS.time(method=method):
+            resp = requests.post(url, data=payload, files=files)
+        result = resp.json()
+    except Exception:
+        TELEGRAM_SEND_TOTAL.inc(method=method, outcome="exception")
+        raise
+    TELEGRAM_SEND_TOTAL.inc(method=method, outcome="ok" if result.get("ok") else "error")
+    return result
+
 def send_telegram_message(chat_id: str, message: str):
-    url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
     payload = {"chat_id": chat_id, "text": message, "parse_mode": "HTML"}
-    resp = requests.post(url, data=payload)
-    return resp.json()
+    return _post("sendMessage", payload)
 
 def send_telegram_image(chat_id: str, image_url: str):
-    url = f"https://api.telegram.org/bot{TOKEN}/sendPhoto"
     payload = {"chat_id": chat_id, "photo": image_url}
-    resp = requests.post(url, data=payload)
-    return resp.json()
+    return _post("sendPhoto", payload)
+
+def send_telegram_photo(chat_id: str, photo, caption: str = None):
+    """
+    Envía una foto. `photo` puede ser bytes (se sube como multipart) o un str
+    con un file_id de Telegram o una URL (no se sube nada).
+    """
+    payload = {"chat_id": chat_id}
+    if caption:
+        payload.update(caption=caption, parse_mode="HTML")
+    if isinstance(photo, (bytes, bytearray)):
+        return _post("sendPhoto", payload, files={"photo": ("grafico.png", bytes(photo), "image/png")})
+    payload["photo"] = photo
+    return _post("sendPhoto", payload)
+
+def photo_file_id(result: dict):
+    """file_id de la versión más grande de la foto en la respuesta de sendPhoto (o None)."""
+    photos = (result.get("result") or {}).get("photo") or []
+    return photos[-1].get("file_id") if photos else None
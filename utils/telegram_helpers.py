@@ -4,10 +4,18 @@ from utils.file_helpers import log_error
 from utils.telegram_client import send_telegram_message # Asume que esta librería existe
 from config.constants import CHAT_ID
 
-def safe_send_message(msg):
-    """Envía un mensaje a Telegram y registra errores si falla."""
+def safe_send_message(msg, chat_id=None) -> bool:
+    """
+    Envía un mensaje a Telegram (por defecto a CHAT_ID) y registra errores si falla.
+    Devuelve True si Telegram lo aceptó.
+    """
     try:
         # Se asume que CHAT_ID se carga correctamente de las variables de entorno
-        send_telegram_message(CHAT_ID, msg)
+        result = send_telegram_message(chat_id or CHAT_ID, msg)
     except Exception as e:
-        log_error(f"Error enviando mensaje de Telegram: {e}")
\ No newline at end of file
+        log_error(f"Error enviando mensaje de Telegram: {e}")
+        return False
+    if not (isinstance(result, dict) and result.get("ok")):
+        log_error(f"Telegram rechazó el mensaje: {result}")
+        return False
+    return True
\ No newline at end of file
@@ -0,0 +1,98 @@
+# utils/templating.py
+"""
+Entorno de Jinja2 de la web.
+
+- Las plantillas se compilan una sola vez al arrancar (precompile_templates)
+  y el bytecode queda en TEMPLATE_CACHE_DIR: un worker nuevo carga el código
+  ya compilado en lugar de volver a parsear el HTML. Con auto_reload apagado
+  Jinja2 tampoco revisa el archivo en cada request.
+- Cada tarjeta de dolar_table.html se renderiza aparte (_dolar_card.html) y
+  se cachea por tipo con una clave armada con sus propios datos: cotización,
+  apertura, cola del sparkline y métricas de ese tipo. Un tick nuevo solo
+  re-renderiza las tarjetas de los tipos que se movieron.
+"""
+
+import os
+import threading
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, pass_context
+from markupsafe import Markup
+
+from config.constants import TEMPLATE_CACHE_DIR
+from utils.charts import sparkline_svg
+from utils.file_helpers import log_error
+from utils.helpers import time_ago
+from utils.metrics import CARD_CACHE_TOTAL
+
+CARD_TEMPLATE = "_dolar_card.html"
+
+_cards = {} # tipo -> (clave, Markup) de la última versión renderizada
+_cards_lock = threading.Lock()
+
+def create_templates(directory="templates") -> Jinja2Templates:
+    """Jinja2Templates con caché de bytecode en disco y el helper render_card."""
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR))
+    except OSError as e:
+        # Sin disco escribible se compila igual, solo que en cada arranque
+        log_error(f"No se pudo usar la caché de plantillas en {TEMPLATE_CACHE_DIR}: {e}")
+        bytecode_cache = None
+
+    # El Environment se arma acá: pasarle opciones extra a Jinja2Templates está deprecado en Starlette
+    env = Environment(
+        loader=FileSystemLoader(directory),
+        autoescape=True,
+        bytecode_cache=bytecode_cache,
+        auto_reload=False,
+    )
+    templates = Jinja2Templates(env=env)
+    templates.env.globals["time_ago"] = time_ago
+    templates.env.globals["render_card"] = render_card
+    return templates
+
+def precompile_templates(templates: Jinja2Templates):
+    """Compila (o carga del bytecode en disco) todas las plantillas. Devuelve cuántas."""
+    env = templates.env
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+def _card_key(rates, series, stats):
+    """Todo lo que se ve en la tarjeta: si no cambia, el HTML tampoco."""
+    return (
+        rates.quote,
+        rates.opening,
+        series[1].tobytes() if series else None,
+        tuple(stats.items()) if stats else None,
+    )
+
+@pass_context
+def render_card(context, name, rates):
+    """
+    HTML de la tarjeta de `name`. Usa del contexto `sparkline_series`
+    ({tipo: (xs, ys)}) y `analytics` ({tipo: métricas}); solo se cachea si el
+    contexto trae `cache_cards` (ej. /mock, con datos al azar, no).
+    """
+    series = (context.get("sparkline_series") or {}).get(name)
+    stats = (context.get("analytics") or {}).get(name)
+    key = _card_key(rates, series, stats) if context.get("cache_cards") else None
+    if key is not None:
+        cached = _cards.get(name)
+        if cached is not None and cached[0] == key:
+            CARD_CACHE_TOTAL.inc(result="hit")
+            return cached[1]
+
+    html = Markup(context.environment.get_template(CARD_TEMPLATE).render(
+        name=name,
+        rates=rates,
+        sparkline=Markup(sparkline_svg(series[1], color="currentColor")) if series else "",
+        stats=stats,
+    ))
+    CARD_CACHE_TOTAL.inc(result="render")
+    if key is not None:
+        with _cards_lock:
+            _cards[name] = (key, html)
+    return html